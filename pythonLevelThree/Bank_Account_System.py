@@ -19,11 +19,29 @@
 # - Generate account statements
 
 from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Sequence
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass, field
 from datetime import datetime
-from decimal import Decimal
-from typing import List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from decimal import Decimal, ROUND_HALF_EVEN
+from fractions import Fraction
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple, Union
 from enum import Enum
+from functools import lru_cache
+import bisect
+import csv
+import heapq
+import itertools
+import json
+import threading
+import time
+
+try:
+    import numpy as np                      # optional: vectorized interest posting
+except ImportError:
+    np = None
 
 
 class TransactionType(Enum):
@@ -44,60 +62,342 @@ class Transaction:
     balance_after: Decimal = Decimal("0")
 
 
+# ------------------------------- Money helpers -------------------------------
+# Amounts are kept in integer minor units (paise); Decimal only at the API edges.
+CENT = Decimal("0.01")
+
+
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1       # Range of the ledger's int64 columns
+
+
+def to_minor(amount: Union[Decimal, int, str]) -> int:
+    """Decimal rupees -> integer paise, rounded half-even to the cent
+
+    Raises ValueError for amounts the ledger's int64 columns cannot hold.
+    """
+    return _int64(int(Decimal(amount).quantize(CENT, rounding=ROUND_HALF_EVEN).scaleb(2)))
+
+
+def _int64(minor: int) -> int:
+    """minor unchanged if it fits an int64 ledger column, else ValueError (check before mutating)"""
+    if not _INT64_MIN <= minor <= _INT64_MAX:
+        raise ValueError(f"amount out of range: {Decimal(minor).scaleb(-2)}")
+    return minor
+
+
+def from_minor(units: int) -> Decimal:
+    """Integer paise -> Decimal rupees with two places"""
+    return Decimal(units).scaleb(-2)
+
+
+def round_half_even(numerator: int, denominator: int) -> int:
+    """numerator / denominator rounded half-even, exact integer arithmetic"""
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if twice > denominator or (twice == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+@lru_cache(maxsize=None)
+def monthly_rate(annual_rate: Decimal) -> Tuple[int, int]:
+    """Exact monthly rate as (numerator, denominator)"""
+    rate = Fraction(annual_rate) / 12
+    return rate.numerator, rate.denominator
+
+
+def monthly_interest_minor(balance_minor: int, annual_rate: Decimal) -> int:
+    """One month of interest on a balance, in paise, rounded half-even"""
+    numerator, denominator = monthly_rate(annual_rate)
+    return round_half_even(balance_minor * numerator, denominator)
+
+
+def to_ns(when: datetime) -> int:
+    """Datetime -> epoch nanoseconds, exact to the microsecond"""
+    return int(when.timestamp()) * 1_000_000_000 + when.microsecond * 1000
+
+
+def from_ns(stamp: int) -> datetime:
+    """Epoch nanoseconds -> local datetime, truncated to the microsecond"""
+    return datetime.fromtimestamp(stamp // 1_000_000_000).replace(microsecond=stamp // 1000 % 1_000_000)
+
+
+# ------------------------------- Columnar Ledger -------------------------------
+_TYPES = list(TransactionType)
+_TYPE_CODES = {t_type: code for code, t_type in enumerate(_TYPES)}
+
+
+class _DescriptionTable:
+    """Interned transaction descriptions shared by every ledger"""
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def intern(self, text: str) -> int:
+        text_id = self.ids.get(text)
+        if text_id is None:
+            with self._lock:
+                text_id = self.ids.get(text)
+                if text_id is None:
+                    text_id = len(self.texts)
+                    self.texts.append(text)
+                    self.ids[text] = text_id
+        return text_id
+
+
+DESCRIPTIONS = _DescriptionTable()
+
+
+class TransactionLedger(Sequence):
+    """Append-only transaction history stored column by column in typed arrays
+
+    Each row costs 29 bytes (int64 amount, uint8 type, int64 timestamp ns,
+    int64 balance after, uint32 description id) instead of a dataclass with a
+    Decimal, a datetime and an enum. Indexing and iteration build Transaction
+    views on demand, so code written against a list of Transactions still works.
+    """
+
+    def __init__(self):
+        self.amounts = array("q")                 # amount in paise
+        self.types = array("B")                   # TransactionType code
+        self.timestamps = array("q")              # epoch nanoseconds, non-decreasing
+        self.balances = array("q")                # balance after, in paise
+        self.descriptions = array("I")            # DESCRIPTIONS id
+
+    def record(self, t_type: TransactionType, amount_minor: int, balance_minor: int,
+               description: str = "", timestamp_ns: int = None) -> int:
+        """Append a row, returns its index"""
+        return self.append_row(_TYPE_CODES[t_type], amount_minor, balance_minor,
+                               DESCRIPTIONS.intern(description), timestamp_ns)
+
+    def append_row(self, type_code: int, amount_minor: int, balance_minor: int,
+                   description_id: int, timestamp_ns: int = None) -> int:
+        """Append pre-encoded column values, returns the row index
+
+        Without timestamp_ns the row is stamped now, or with the previous row's
+        stamp if the wall clock stepped back. An explicit stamp older than the
+        previous row raises ValueError, since balance_at() bisects this column.
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+            if self.timestamps and timestamp_ns < self.timestamps[-1]:
+                timestamp_ns = self.timestamps[-1]
+        elif self.timestamps and timestamp_ns < self.timestamps[-1]:
+            raise ValueError(f"timestamp {timestamp_ns} is before the previous row ({self.timestamps[-1]})")
+        self.amounts.append(amount_minor)
+        self.types.append(type_code)
+        self.timestamps.append(timestamp_ns)
+        self.balances.append(balance_minor)
+        self.descriptions.append(description_id)
+        return len(self.amounts) - 1
+
+    def truncate(self, length: int) -> None:
+        """Drop every row from `length` on (rollback of rows not yet committed)"""
+        for column in (self.amounts, self.types, self.timestamps, self.balances, self.descriptions):
+            del column[length:]
+
+    def append(self, txn: Transaction) -> None:
+        """List-compatible append of a Transaction object"""
+        self.record(txn.type, to_minor(txn.amount), to_minor(txn.balance_after), txn.description,
+                    to_ns(txn.timestamp))
+
+    def view(self, i: int) -> Transaction:
+        return Transaction(
+            type=_TYPES[self.types[i]],
+            amount=from_minor(self.amounts[i]),
+            timestamp=from_ns(self.timestamps[i]),
+            description=DESCRIPTIONS.texts[self.descriptions[i]],
+            balance_after=from_minor(self.balances[i]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.view(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("ledger index out of range")
+        return self.view(i)
+
+    def __iter__(self):
+        return (self.view(i) for i in range(len(self)))
+
+    def span(self, start: datetime = None, end: datetime = None) -> Tuple[int, int]:
+        """Row range [lo, hi) with start <= timestamp <= end, by binary search"""
+        lo = bisect.bisect_left(self.timestamps, to_ns(start)) if start else 0
+        # Views are truncated to the microsecond, so `end` covers its whole microsecond
+        hi = bisect.bisect_right(self.timestamps, to_ns(end) + 999) if end else len(self)
+        return lo, max(lo, hi)
+
+    def balance_at(self, stamp_ns: int, opening_minor: int) -> int:
+        """Balance after the last row at or before stamp_ns, in paise, by binary search
+
+        The balance-after column is a checkpoint on every row, so no replay is needed.
+        """
+        row = bisect.bisect_right(self.timestamps, stamp_ns) - 1
+        return self.balances[row] if row >= 0 else opening_minor
+
+    def nbytes(self) -> int:
+        """Bytes used by the column buffers"""
+        return sum(col.itemsize * len(col) for col in
+                   (self.amounts, self.types, self.timestamps, self.balances, self.descriptions))
+
+
 class Account(ABC):
+    INTEREST_RATE: Optional[Decimal] = None       # annual rate; classes setting it accrue monthly interest
+    INTEREST_DESCRIPTION = "Monthly interest"
+
     def __init__(self, account_number: str, owner: str, initial_balance: Decimal = Decimal("0")):
         self.account_number = account_number
         self.owner = owner
-        self._balance = initial_balance
-        self.transactions: List[Transaction] = []
+        self._balance_minor = to_minor(initial_balance) if initial_balance else 0
+        self._opening_minor = self._balance_minor     # balance before the first ledger row
+        self.opened_ns = time.time_ns()               # epoch ns; balance_at() is None before it
+        self.ledger = TransactionLedger()
         self.is_active = True
+        self._lock = threading.RLock()            # guards balance and ledger; Bank takes it in account order
+        self._depth = 0                           # nesting of operations holding the lock
+        self._journal = None                      # write-ahead log set by the owning Bank, if any
+        self._journaled = 0                       # ledger rows already handed to the journal
+        self._feed = None                         # change feed set by the owning Bank, if any
+        self._published = 0                       # ledger rows already handed to the feed
+        self._index = None                        # owning Bank's AccountIndex, if it keeps one
+        self._index_slot = 0                      # position in that index
+        self._indexed_key = 0                     # key the balance index files this account under
 
     @property
     def balance(self) -> Decimal:
-        return self._balance
+        return from_minor(self._balance_minor)
+
+    @property
+    def _balance(self) -> Decimal:
+        return from_minor(self._balance_minor)
+
+    @property
+    def transactions(self) -> TransactionLedger:
+        return self.ledger
+
+    def _post(self, t_type: TransactionType, amount_minor: int, description: str = ""):
+        self.ledger.record(t_type, amount_minor, self._balance_minor, description)
 
     def _record_transaction(self, t_type: TransactionType, amount: Decimal, description: str = ""):
-        txn = Transaction(
-            type=t_type,
-            amount=amount,
-            description=description,
-            balance_after=self._balance
-        )
-        self.transactions.append(txn)
+        self._post(t_type, to_minor(amount), description)
 
     def deposit(self, amount: Decimal, description: str = "") -> bool:
-        if amount <= 0:
+        amount_minor = to_minor(amount)
+        if amount_minor <= 0:
             return False
-        self._balance += amount
-        self._record_transaction(TransactionType.DEPOSIT, amount, description)
+        with self._operation():
+            self._balance_minor = _int64(self._balance_minor + amount_minor)
+            self._post(TransactionType.DEPOSIT, amount_minor, description)
         return True
 
+    @contextmanager
+    def _operation(self):
+        """Hold the lock; the outermost operation journals and publishes its new ledger rows on the way out"""
+        with self._lock:
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            outermost = not self._depth
+            commit = self._journal.capture((self,)) if self._journal is not None and outermost else 0
+            feed = self._feed if outermost else None
+            if feed is not None:
+                feed.capture((self,))
+            if outermost and self._index is not None:
+                self._index.update((self,))
+        if commit:
+            self._journal.wait(commit)
+        if feed is not None:
+            feed.deliver()
+
+    def balance_at(self, when: datetime) -> Optional[Decimal]:
+        """Balance as of a past moment, None if the account was not open yet"""
+        minor = self._balance_minor_at(to_ns(when) + 999)       # `when` covers its whole microsecond
+        return None if minor is None else from_minor(minor)
+
+    def _balance_minor_at(self, stamp_ns: int) -> Optional[int]:
+        if stamp_ns < self.opened_ns:
+            return None
+        with self._lock:
+            return self.ledger.balance_at(stamp_ns, self._opening_minor)
+
+    def _checkpoint(self) -> Tuple[int, int]:
+        """Balance and ledger length to roll back to; call with the lock held"""
+        return self._balance_minor, len(self.ledger)
+
+    def _rollback(self, checkpoint: Tuple[int, int]) -> None:
+        self._balance_minor, length = checkpoint
+        self.ledger.truncate(length)
+
     @abstractmethod
     def withdraw(self, amount: Decimal) -> bool:
         pass
 
+    def _debit_fee(self, balance_minor: int, amount_minor: int) -> Optional[int]:
+        """Fee for debiting amount from balance under this account's rules, None if refused"""
+        return 0 if amount_minor <= balance_minor else None
+
     @abstractmethod
     def calculate_interest(self) -> Decimal:
         pass
 
-    def get_statement(self, start_date: datetime = None, end_date: datetime = None) -> str:
-        statement_lines = [
+    def _statement_header(self) -> List[str]:
+        return [
             f"\n--- Account Statement for {self.owner} ({self.account_number}) ---",
             f"Current Balance: ₹{self.balance}",
             "Transactions:"
         ]
 
-        for txn in self.transactions:
-            if start_date and txn.timestamp < start_date:
-                continue
-            if end_date and txn.timestamp > end_date:
-                continue
-
-            statement_lines.append(
-                f"{txn.timestamp} | {txn.type.value.upper():12} | Amount: ₹{txn.amount} | "
-                f"Balance After: ₹{txn.balance_after} | {txn.description}"
-            )
-
+    def iter_statement(self, start_date: datetime = None, end_date: datetime = None,
+                       offset: int = 0, limit: int = None) -> Iterator[str]:
+        """Yield statement lines for transactions in the date range, paginated by offset/limit"""
+        lo, hi = self.transactions.span(start_date, end_date)
+        lo = min(lo + offset, hi)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        view = self.transactions.view
+        for i in range(lo, hi):
+            txn = view(i)
+            yield (f"{txn.timestamp} | {txn.type.value.upper():12} | Amount: ₹{txn.amount} | "
+                   f"Balance After: ₹{txn.balance_after} | {txn.description}")
+
+    def count_statement(self, start_date: datetime = None, end_date: datetime = None) -> int:
+        """Number of transactions in the date range, for pagination"""
+        lo, hi = self.transactions.span(start_date, end_date)
+        return hi - lo
+
+    def write_statement(self, fp: TextIO, start_date: datetime = None, end_date: datetime = None,
+                        page_size: int = 1000) -> int:
+        """Stream the statement to a file-like object (e.g. sock.makefile("w")) a page at a time
+
+        Returns the number of transaction lines written.
+        """
+        fp.write("\n".join(self._statement_header()) + "\n")
+        written = 0
+        page = []
+        for line in self.iter_statement(start_date, end_date):
+            page.append(line)
+            if len(page) >= page_size:
+                fp.write("\n".join(page) + "\n")
+                written += len(page)
+                page = []
+        if page:
+            fp.write("\n".join(page) + "\n")
+            written += len(page)
+        return written
+
+    def get_statement(self, start_date: datetime = None, end_date: datetime = None,
+                      offset: int = 0, limit: int = None) -> str:
+        statement_lines = self._statement_header()
+        statement_lines.extend(self.iter_statement(start_date, end_date, offset, limit))
         return "\n".join(statement_lines)
 
 
@@ -106,17 +406,20 @@ class SavingsAccount(Account):
     INTEREST_RATE = Decimal("0.02")  # 2% annual
 
     def withdraw(self, amount: Decimal) -> bool:
-        if amount <= 0 or amount > self._balance:
-            return False
-        self._balance -= amount
-        self._record_transaction(TransactionType.WITHDRAWAL, amount, "Savings withdrawal")
-        return True
+        with self._operation():
+            amount_minor = to_minor(amount)
+            if amount_minor <= 0 or amount_minor > self._balance_minor:
+                return False
+            self._balance_minor -= amount_minor
+            self._post(TransactionType.WITHDRAWAL, amount_minor, "Savings withdrawal")
+            return True
 
     def calculate_interest(self) -> Decimal:
-        interest = self._balance * (self.INTEREST_RATE / 12)  # monthly interest
-        self._balance += interest
-        self._record_transaction(TransactionType.INTEREST, interest, "Monthly interest")
-        return interest
+        with self._operation():
+            interest = monthly_interest_minor(self._balance_minor, self.INTEREST_RATE)  # monthly interest
+            self._balance_minor = _int64(self._balance_minor + interest)
+            self._post(TransactionType.INTEREST, interest, self.INTEREST_DESCRIPTION)
+            return from_minor(interest)
 
 
 # ------------------------------- Checking Account -------------------------------
@@ -125,25 +428,35 @@ class CheckingAccount(Account):
     OVERDRAFT_FEE = Decimal("35")
 
     def withdraw(self, amount: Decimal) -> bool:
-        if amount <= 0:
-            return False
+        with self._operation():
+            amount_minor = to_minor(amount)
+            if amount_minor <= 0:
+                return False
+
+            if self._balance_minor >= amount_minor:
+                # Normal withdrawal
+                self._balance_minor -= amount_minor
+                self._post(TransactionType.WITHDRAWAL, amount_minor, "Checking withdrawal")
+                return True
+
+            # Overdraft case
+            overdraft_needed = amount_minor - self._balance_minor
+            if overdraft_needed <= to_minor(self.OVERDRAFT_LIMIT):
+                fee = to_minor(self.OVERDRAFT_FEE)
+                self._balance_minor -= amount_minor
+                self._balance_minor -= fee
+                self._post(TransactionType.WITHDRAWAL, amount_minor, "Overdraft withdrawal")
+                self._post(TransactionType.FEE, fee, "Overdraft fee")
+                return True
 
-        if self._balance >= amount:
-            # Normal withdrawal
-            self._balance -= amount
-            self._record_transaction(TransactionType.WITHDRAWAL, amount, "Checking withdrawal")
-            return True
-
-        # Overdraft case
-        overdraft_needed = amount - self._balance
-        if overdraft_needed <= self.OVERDRAFT_LIMIT:
-            self._balance -= amount
-            self._balance -= self.OVERDRAFT_FEE
-            self._record_transaction(TransactionType.WITHDRAWAL, amount, "Overdraft withdrawal")
-            self._record_transaction(TransactionType.FEE, self.OVERDRAFT_FEE, "Overdraft fee")
-            return True
+            return False
 
-        return False
+    def _debit_fee(self, balance_minor: int, amount_minor: int) -> Optional[int]:
+        if balance_minor >= amount_minor:
+            return 0
+        if amount_minor - balance_minor <= to_minor(self.OVERDRAFT_LIMIT):
+            return to_minor(self.OVERDRAFT_FEE)
+        return None
 
     def calculate_interest(self) -> Decimal:
         return Decimal("0")  # Checking accounts do not earn interest
@@ -152,31 +465,323 @@ class CheckingAccount(Account):
 # ------------------------------- Business Account -------------------------------
 class BusinessAccount(Account):
     INTEREST_RATE = Decimal("0.01")  # 1% annual
+    INTEREST_DESCRIPTION = "Business monthly interest"
 
     def withdraw(self, amount: Decimal) -> bool:
-        if amount <= 0 or amount > self._balance:
-            return False
-        self._balance -= amount
-        self._record_transaction(TransactionType.WITHDRAWAL, amount, "Business withdrawal")
-        return True
+        with self._operation():
+            amount_minor = to_minor(amount)
+            if amount_minor <= 0 or amount_minor > self._balance_minor:
+                return False
+            self._balance_minor -= amount_minor
+            self._post(TransactionType.WITHDRAWAL, amount_minor, "Business withdrawal")
+            return True
 
     def calculate_interest(self) -> Decimal:
-        interest = self._balance * (self.INTEREST_RATE / 12)
-        self._balance += interest
-        self._record_transaction(TransactionType.INTEREST,interest, "Business monthly interest")
-        return interest
+        with self._operation():
+            interest = monthly_interest_minor(self._balance_minor, self.INTEREST_RATE)
+            self._balance_minor = _int64(self._balance_minor + interest)
+            self._post(TransactionType.INTEREST, interest, self.INTEREST_DESCRIPTION)
+            return from_minor(interest)
+
+
+# ------------------------------- Interest Engine -------------------------------
+_INT64_HEADROOM = 1 << 62
+
+
+def interest_column(balances: List[int], numerator: int, denominator: int) -> List[int]:
+    """balance * numerator / denominator for every balance, rounded half-even like round_half_even"""
+    if np is not None and balances and \
+            max(max(balances), -min(balances)) * numerator < _INT64_HEADROOM and denominator < _INT64_HEADROOM:
+        quotient, remainder = np.divmod(np.array(balances, dtype=np.int64) * numerator, denominator)
+        twice = 2 * remainder
+        quotient += (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+        return quotient.tolist()
+    return [round_half_even(balance * numerator, denominator) for balance in balances]
+
+
+def post_monthly_interest(accounts) -> int:
+    """Accrue one month of interest on many accounts at once, returns the total in paise
+
+    Accounts are grouped by (class, INTEREST_RATE); each group's interest is
+    computed as one fixed-point column and posted with a shared description id.
+    Balances and ledger rows match calculate_interest() exactly.
+    Accounts whose class has no INTEREST_RATE go through calculate_interest().
+    """
+    groups: Dict[Tuple[type, Decimal], List[Account]] = {}
+    for account in accounts:
+        rate = type(account).INTEREST_RATE
+        if rate is None:
+            account.calculate_interest()
+        else:
+            groups.setdefault((type(account), rate), []).append(account)
+
+    total = commit = op = 0
+    feed = None
+    code = _TYPE_CODES[TransactionType.INTEREST]
+    for (cls, rate), group in groups.items():
+        numerator, denominator = monthly_rate(rate)
+        balances = [account._balance_minor for account in group]
+        interests = interest_column(balances, numerator, denominator)
+        text_id = DESCRIPTIONS.intern(cls.INTEREST_DESCRIPTION)
+        for account, balance, interest in zip(group, balances, interests):
+            with account._lock:
+                if account._balance_minor != balance:      # moved by a concurrent transfer
+                    interest = monthly_interest_minor(account._balance_minor, rate)
+                account._balance_minor = _int64(account._balance_minor + interest)
+                account.ledger.append_row(code, interest, account._balance_minor, text_id)
+                if account._journal is not None:
+                    journal, commit = account._journal, account._journal.capture((account,))
+                if account._feed is not None:
+                    feed, op = account._feed, account._feed.capture((account,), op)   # one event group
+                if account._index is not None:
+                    account._index.update((account,))
+            total += interest
+    if commit:
+        journal.wait(commit)                               # one durability wait for the whole run
+    if feed is not None:
+        feed.deliver()
+    return total
+
+
+# ------------------------------- Batch Payments -------------------------------
+@dataclass
+class BatchReport:
+    committed: bool
+    results: List[str]                        # "ok" or the rejection reason, one per item in input order
+    accounts_posted: int = 0
+    total_moved: Decimal = Decimal("0")
+
+    @property
+    def failures(self) -> List[Tuple[int, str]]:
+        return [(index, result) for index, result in enumerate(self.results) if result != "ok"]
+
+
+def _open_text(source):
+    """Path or already-open text file -> (file, should_close)"""
+    if isinstance(source, str):
+        return open(source, newline=""), True
+    return source, False
+
+
+def _field(value) -> Optional[str]:
+    """Stripped text of a transfer field, None when it is missing or blank"""
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+
+def read_transfers_csv(source) -> Iterator[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    """Stream (from, to, amount) rows from a CSV with a from,to,amount header
+
+    Missing fields of short rows come through as None; execute_batch reports them as invalid rows.
+    """
+    fh, owned = _open_text(source)
+    try:
+        for row in csv.DictReader(fh):
+            yield _field(row.get("from")), _field(row.get("to")), _field(row.get("amount"))
+    finally:
+        if owned:
+            fh.close()
+
+
+def read_transfers_jsonl(source) -> Iterator[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    """Stream (from, to, amount) items from JSON lines like {"from": "1001", "to": "1002", "amount": "25.00"}"""
+    fh, owned = _open_text(source)
+    try:
+        for line in fh:
+            if line.strip():
+                item = json.loads(line)
+                yield _field(item.get("from")), _field(item.get("to")), _field(item.get("amount"))
+    finally:
+        if owned:
+            fh.close()
+
+
+# ------------------------------- Secondary Indexes -------------------------------
+_ACCOUNT_TYPES = {"savings": SavingsAccount, "checking": CheckingAccount, "business": BusinessAccount}
+
+
+def _account_class(account_type: str) -> type:
+    cls = _ACCOUNT_TYPES.get(account_type.lower())
+    if cls is None:
+        raise ValueError("Invalid account type")
+    return cls
+
+
+class _SortedKeys:
+    """Sorted int keys kept in short buckets
+
+    Updates cost a bisect over the bucket maxima plus an insert into one bucket
+    of at most 2 * BUCKET keys, instead of shifting one list of every account.
+    """
+
+    BUCKET = 256
+
+    def __init__(self, keys: List[int] = ()):
+        keys = sorted(keys)
+        self._buckets = [keys[i:i + self.BUCKET] for i in range(0, len(keys), self.BUCKET)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets)
+
+    def add(self, key: int) -> None:
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            return
+        i = min(bisect.bisect_left(self._maxes, key), len(self._maxes) - 1)
+        bucket = self._buckets[i]
+        bisect.insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        if len(bucket) > 2 * self.BUCKET:
+            half = len(bucket) // 2
+            self._buckets[i:i + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[i:i + 1] = [bucket[half - 1], bucket[-1]]
+
+    def remove(self, key: int) -> None:
+        i = bisect.bisect_left(self._maxes, key)
+        bucket = self._buckets[i]
+        del bucket[bisect.bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[i] = bucket[-1]
+        else:
+            del self._buckets[i], self._maxes[i]
+
+    def irange(self, low: int, high: int) -> Iterator[int]:
+        """Keys with low <= key < high, ascending"""
+        i = bisect.bisect_left(self._maxes, low)
+        if i == len(self._buckets):
+            return
+        j = bisect.bisect_left(self._buckets[i], low)
+        for bucket in self._buckets[i:]:
+            for key in bucket[j:] if j else bucket:
+                if key >= high:
+                    return
+                yield key
+            j = 0
+
+    def descending(self) -> Iterator[int]:
+        for bucket in reversed(self._buckets):
+            yield from reversed(bucket)
+
+
+_SLOT_BITS = 32                                # balance key = balance paise << 32 | account slot
+_SLOT_MASK = (1 << _SLOT_BITS) - 1
+
+
+class AccountIndex:
+    """Owner, account type and per-type balance indexes over a bank's accounts
+
+    Account operations call update() with their account locks held; it only
+    marks the accounts as moved. Every query first re-files the moved accounts
+    under the index lock, so results reflect every completed operation and cost
+    time proportional to the result plus the balance changes since the last query.
+    Balance keys are single ints (balance, then indexing order) so the sorted
+    buckets compare integers rather than tuples.
+    """
+
+    def __init__(self, accounts=()):
+        self._lock = threading.Lock()
+        self._slots: List[Account] = []                      # slot -> account
+        self._moved = set()                                  # accounts whose balance key may be stale
+        self.by_owner: Dict[str, Dict[str, Account]] = {}
+        self.by_type: Dict[type, Dict[str, Account]] = {cls: {} for cls in _ACCOUNT_TYPES.values()}
+        self.by_balance: Dict[type, _SortedKeys] = {}
+        for account in accounts:
+            self._file(account)
+        self._rebuild()
+
+    def _file(self, account: Account) -> int:
+        """Register account in the owner and type indexes, returns its balance key"""
+        number = account.account_number
+        self.by_owner.setdefault(account.owner, {})[number] = account
+        self.by_type.setdefault(type(account), {})[number] = account
+        account._index_slot = len(self._slots)
+        self._slots.append(account)
+        account._indexed_key = account._balance_minor << _SLOT_BITS | account._index_slot
+        account._index = self
+        return account._indexed_key
+
+    def _rebuild(self) -> None:
+        """Re-sort every balance column from the current balances"""
+        for cls, accounts in self.by_type.items():
+            for account in accounts.values():
+                account._indexed_key = account._balance_minor << _SLOT_BITS | account._index_slot
+            self.by_balance[cls] = _SortedKeys([account._indexed_key for account in accounts.values()])
+
+    def add(self, account: Account) -> None:
+        with self._lock:
+            self.by_balance.setdefault(type(account), _SortedKeys()).add(self._file(account))
+
+    def update(self, accounts) -> None:
+        """Note that the accounts' balances may have moved; the caller holds their locks"""
+        self._moved.update(accounts)
+
+    def _refresh(self) -> None:
+        """Re-file moved accounts, call with the index lock held"""
+        moved = self._moved
+        if len(moved) > len(self._slots) // 4:
+            moved.clear()                                   # cheaper to re-sort everything
+            self._rebuild()
+            return
+        while moved:
+            account = moved.pop()                           # atomic, so concurrent update()s are not lost
+            key = account._balance_minor << _SLOT_BITS | account._index_slot
+            if key != account._indexed_key:
+                keys = self.by_balance[type(account)]
+                keys.remove(account._indexed_key)
+                keys.add(key)
+                account._indexed_key = key
+
+    def _types(self, account_type: Optional[str]) -> List[type]:
+        return list(self.by_balance) if account_type is None else [_account_class(account_type)]
+
+    def owned_by(self, owner: str) -> List[Account]:
+        with self._lock:
+            return list(self.by_owner.get(owner, {}).values())
+
+    def of_type(self, account_type: str) -> List[Account]:
+        with self._lock:
+            return list(self.by_type[_account_class(account_type)].values())
+
+    def balance_range(self, low: Optional[int], high: Optional[int], account_type: str = None) -> List[Account]:
+        """Accounts with low <= balance < high (paise, None = unbounded), ascending by balance"""
+        low_key = -(1 << 127) if low is None else low << _SLOT_BITS
+        high_key = 1 << 127 if high is None else high << _SLOT_BITS
+        with self._lock:
+            self._refresh()
+            runs = [list(self.by_balance[cls].irange(low_key, high_key)) for cls in self._types(account_type)]
+            return [self._slots[key & _SLOT_MASK] for key in heapq.merge(*runs)]
+
+    def top(self, n: int, account_type: str = None) -> List[Account]:
+        """n highest balances, highest first"""
+        with self._lock:
+            self._refresh()
+            runs = [list(itertools.islice(self.by_balance[cls].descending(), n))
+                    for cls in self._types(account_type)]
+            return [self._slots[key & _SLOT_MASK] for key in
+                    itertools.islice(heapq.merge(*runs, reverse=True), n)]
 
 
 # ------------------------------- Bank Class -------------------------------
 class Bank:
-    def __init__(self, name: str):
+    def __init__(self, name: str, workers: int = 8, indexed: bool = True):
         self.name = name
         self.accounts: dict[str, Account] = {}
         self._next_acc_number = 1001
+        self._acc_number_stride = 1               # shards hand out every n-th number (Bank_Sharding)
+        self._lock = threading.Lock()             # account numbering and the accounts dict
+        self.workers = workers                    # threads used by submit_transfers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.journal = None                       # write-ahead log (Bank_Persistence.BankStore sets it)
+        self.feed = None                          # change-data capture (Bank_ChangeFeed.ChangeFeed sets it)
+        self.index = AccountIndex() if indexed else None   # owner / type / balance lookups
 
     def _generate_account_number(self) -> str:
-        acc = str(self._next_acc_number)
-        self._next_acc_number += 1
+        with self._lock:
+            acc = str(self._next_acc_number)
+            self._next_acc_number += self._acc_number_stride
         return acc
 
     def create_account(self, account_type: str, owner: str,
@@ -194,31 +799,233 @@ class Bank:
         else:
             raise ValueError("Invalid account type")
 
-        self.accounts[acc_no] = account
+        account._journal = self.journal
+        feed = self.feed
+        if feed is not None:
+            feed.opened(account)
+        if self.index is not None:
+            self.index.add(account)
+        with self._lock:
+            self.accounts[acc_no] = account
+        if self.journal is not None:
+            self.journal.wait(self.journal.create(account))
+        if feed is not None:
+            feed.deliver()
         return account
 
     def transfer(self, from_account: str, to_account: str,
                  amount: Decimal) -> bool:
-
-        if from_account not in self.accounts or to_account not in self.accounts:
+        """Move money atomically: both accounts change or neither does"""
+        sender = self.accounts.get(from_account)
+        receiver = self.accounts.get(to_account)
+        if sender is None or receiver is None:
             return False
 
-        sender = self.accounts[from_account]
-        receiver = self.accounts[to_account]
-
-        if sender.withdraw(amount):
-            receiver.deposit(amount, f"Transfer from {from_account}")
+        # Lock both accounts in account-number order so opposite transfers cannot deadlock
+        first, second = sorted((sender, receiver), key=lambda acc: acc.account_number)
+        commit = 0
+        feed = self.feed
+        with first._lock, second._lock:
+            sender._depth += 1
+            receiver._depth += 1
+            try:
+                done = self._move(sender, receiver, amount)
+            finally:
+                sender._depth -= 1
+                receiver._depth -= 1
+            if done and self.journal is not None:
+                commit = self.journal.capture((sender, receiver))      # both sides in one record
+            if done and feed is not None:
+                feed.capture((sender, receiver))                       # and in one event group
+            if done and self.index is not None:
+                self.index.update((sender, receiver))
+        if commit:
+            self.journal.wait(commit)
+        if feed is not None:
+            feed.deliver()
+        return done
+
+    @staticmethod
+    def _move(sender: Account, receiver: Account, amount: Decimal) -> bool:
+        """Debit and credit with both locks held, rolling both back on failure"""
+        if not (sender.is_active and receiver.is_active):
+            return False
+        sender_mark, receiver_mark = sender._checkpoint(), receiver._checkpoint()
+        try:
+            if not sender.withdraw(amount):
+                return False
+            if not receiver.deposit(amount, f"Transfer from {sender.account_number}"):
+                raise ValueError("credit rejected")
             sender._record_transaction(TransactionType.TRANSFER_OUT, amount,
-                                      f"Transfer to {to_account}")
+                                      f"Transfer to {receiver.account_number}")
             receiver._record_transaction(TransactionType.TRANSFER_IN, amount,
-                                        f"Transfer from {from_account}")
-            return True
-
-        return False
+                                        f"Transfer from {sender.account_number}")
+        except Exception:
+            sender._rollback(sender_mark)
+            receiver._rollback(receiver_mark)
+            return False
+        return True
 
-    def apply_monthly_interest(self) -> None:
-        for acc in self.accounts.values():
-            acc.calculate_interest()
+    def submit_transfers(self, transfers) -> List[Future]:
+        """Run (from, to, amount) transfers on the bank's thread pool, one Future[bool] each"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="transfer")
+        return [self._executor.submit(self.transfer, *transfer) for transfer in transfers]
+
+    def shutdown(self) -> None:
+        """Wait for submitted transfers and stop the thread pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def execute_batch(self, transfers, description: str = "Batch transfer") -> BatchReport:
+        """Apply many (from, to, amount) transfers as one all-or-nothing unit
+
+        Every item is validated in input order against running balances and each
+        account's debit rules (checking overdraft limit and fee included) with all
+        involved accounts locked. If any item fails nothing is posted; otherwise
+        each account gets one net TRANSFER_IN/TRANSFER_OUT row (plus one FEE row
+        for its overdraft fees) and the batch is journaled as a single record
+        and published as one change-feed event group.
+        `transfers` may be any iterable, e.g. read_transfers_csv(path).
+        """
+        accounts = self.accounts
+        items: List[Tuple[Optional[Account], Optional[Account], int]] = []
+        results: List[str] = []
+        involved: Dict[str, Account] = {}
+        for from_account, to_account, amount in transfers:
+            if from_account is None or to_account is None or amount is None:
+                results.append("invalid row: missing from, to or amount")
+                items.append((None, None, 0))
+                continue
+            sender, receiver = accounts.get(from_account), accounts.get(to_account)
+            try:
+                amount_minor = to_minor(amount)
+            except (ArithmeticError, ValueError, TypeError):     # NaN, infinity, garbage
+                amount_minor = 0
+            if sender is None or receiver is None:
+                results.append(f"unknown account {from_account if sender is None else to_account}")
+            elif sender is receiver:
+                results.append("same account")
+            elif amount_minor <= 0:
+                results.append("invalid amount")
+            else:
+                results.append("ok")
+                involved[sender.account_number] = sender
+                involved[receiver.account_number] = receiver
+            items.append((sender, receiver, amount_minor))
+
+        ordered = [involved[number] for number in sorted(involved)]
+        commit = 0
+        feed = self.feed
+        with ExitStack() as locks:
+            for account in ordered:
+                locks.enter_context(account._lock)
+            balances = {account: account._balance_minor for account in ordered}
+            fees = dict.fromkeys(ordered, 0)
+            moved = 0
+            for index, (sender, receiver, amount_minor) in enumerate(items):
+                if results[index] != "ok":
+                    continue
+                if not (sender.is_active and receiver.is_active):
+                    results[index] = "inactive account"
+                    continue
+                fee = sender._debit_fee(balances[sender], amount_minor)
+                if fee is None:
+                    results[index] = f"insufficient funds in {sender.account_number}"
+                    continue
+                if balances[receiver] + amount_minor > _INT64_MAX:
+                    results[index] = f"balance limit exceeded in {receiver.account_number}"
+                    continue
+                balances[sender] -= amount_minor + fee
+                balances[receiver] += amount_minor
+                fees[sender] += fee
+                moved += amount_minor
+
+            if any(result != "ok" for result in results):
+                return BatchReport(False, results)
+
+            posted = 0
+            for account in ordered:
+                fee = fees[account]
+                net = balances[account] + fee - account._balance_minor
+                if net:
+                    account._balance_minor += net
+                    kind = TransactionType.TRANSFER_IN if net > 0 else TransactionType.TRANSFER_OUT
+                    account._post(kind, abs(net), description)
+                if fee:
+                    account._balance_minor -= fee
+                    account._post(TransactionType.FEE, fee, "Overdraft fee")
+                posted += bool(net or fee)
+            if self.journal is not None:
+                commit = self.journal.capture(ordered)             # the whole batch in one record
+            if feed is not None:
+                feed.capture(ordered)
+            if self.index is not None:
+                self.index.update(ordered)
+        if commit:
+            self.journal.wait(commit)
+        if feed is not None:
+            feed.deliver()
+        return BatchReport(True, results, posted, from_minor(moved))
+
+    def balances_at(self, when: datetime) -> Dict[str, Decimal]:
+        """As-of balance of every account open at `when`, in one pass over the accounts"""
+        stamp = to_ns(when) + 999
+        report = {}
+        for number, account in list(self.accounts.items()):
+            minor = account._balance_minor_at(stamp)
+            if minor is not None:
+                report[number] = from_minor(minor)
+        return report
+
+    def apply_monthly_interest(self) -> Decimal:
+        """Post month-end interest on every account through the batch engine, returns the total"""
+        return from_minor(post_monthly_interest(self.accounts.values()))
+
+    # ---------------- INDEXED LOOKUPS (full scans when the bank keeps no index) ----------------
+    def rebuild_indexes(self) -> None:
+        """Index every account from scratch, e.g. after accounts were loaded behind create_account's back"""
+        self.index = AccountIndex(list(self.accounts.values()))
+
+    def accounts_of(self, owner: str) -> List[Account]:
+        if self.index is not None:
+            return self.index.owned_by(owner)
+        return [account for account in list(self.accounts.values()) if account.owner == owner]
+
+    def accounts_of_type(self, account_type: str) -> List[Account]:
+        if self.index is not None:
+            return self.index.of_type(account_type)
+        cls = _account_class(account_type)
+        return [account for account in list(self.accounts.values()) if type(account) is cls]
+
+    def accounts_with_balance(self, low: Decimal = None, high: Decimal = None,
+                              account_type: str = None) -> List[Account]:
+        """Accounts with low <= balance < high (either bound optional), lowest balance first"""
+        low_minor = None if low is None else to_minor(low)
+        high_minor = None if high is None else to_minor(high)
+        if self.index is not None:
+            return self.index.balance_range(low_minor, high_minor, account_type)
+        cls = None if account_type is None else _account_class(account_type)
+        found = [account for account in list(self.accounts.values())
+                 if (cls is None or type(account) is cls)
+                 and (low_minor is None or account._balance_minor >= low_minor)
+                 and (high_minor is None or account._balance_minor < high_minor)]
+        return sorted(found, key=lambda account: (account._balance_minor, account.account_number))
+
+    def overdrawn_accounts(self, account_type: str = "checking") -> List[Account]:
+        return self.accounts_with_balance(high=Decimal("0"), account_type=account_type)
+
+    def top_balances(self, n: int, account_type: str = None) -> List[Account]:
+        """n accounts with the highest balances, highest first"""
+        if self.index is not None:
+            return self.index.top(n, account_type)
+        cls = None if account_type is None else _account_class(account_type)
+        return heapq.nlargest(n, (account for account in list(self.accounts.values())
+                                  if cls is None or type(account) is cls),
+                              key=lambda account: (account._balance_minor, account.account_number))
 
 
 
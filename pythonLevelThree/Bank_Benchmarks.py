@@ -0,0 +1,463 @@
+# Bank System Benchmarks
+# Micro-benchmarks for the accounts and ledger in Bank_Account_System.py
+# Run: python Bank_Benchmarks.py
+
+from datetime import timedelta
+from decimal import Decimal
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from Bank_Account_System import (
+    Bank, SavingsAccount, Transaction, TransactionLedger, TransactionType, from_ns, read_transfers_csv,
+)
+from Bank_ChangeFeed import ChangeFeed
+from Bank_Persistence import SYNC_MODES, BankStore
+from Bank_Sharding import ShardedBank
+from Event_DrivenArchitecture import EventEmitter
+
+
+# ---------------- LEDGER MEMORY ----------------
+
+_KINDS = list(TransactionType)
+
+
+def _list_ledger_bytes(count: int) -> int:
+    """Bytes held by `count` Transaction dataclasses in a list"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [Transaction(type=_KINDS[i % len(_KINDS)], amount=Decimal(i % 5000) / 100,
+                        description=f"Transfer to {1001 + i % 100}",
+                        balance_after=Decimal(i) / 100)
+            for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return after - before
+
+
+def _columnar_ledger(count: int) -> TransactionLedger:
+    ledger = TransactionLedger()
+    stamp = time.time_ns()
+    for i in range(count):
+        ledger.record(_KINDS[i % len(_KINDS)], i % 5000, i, f"Transfer to {1001 + i % 100}", stamp + i)
+    return ledger
+
+
+def ledger_memory(count: int = 10_000_000, sample: int = 200_000) -> dict:
+    """Bytes per transaction: list of dataclasses vs columnar ledger
+
+    The dataclass list is measured on `sample` rows and extrapolated to `count`
+    (10M of them need several GB); the columnar ledger is built at full size.
+    """
+    per_row = _list_ledger_bytes(sample) / sample
+    started = time.perf_counter()
+    ledger = _columnar_ledger(count)
+    elapsed = time.perf_counter() - started
+    return {
+        "transactions": count,
+        "dataclass_bytes_per_txn": per_row,
+        "dataclass_total_mb": per_row * count / 1e6,
+        "columnar_bytes_per_txn": ledger.nbytes() / count,
+        "columnar_total_mb": ledger.nbytes() / 1e6,
+        "columnar_appends_per_sec": count / elapsed,
+    }
+
+
+# ---------------- STATEMENTS ----------------
+
+def statement_range(count: int = 1_000_000, days: int = 30) -> dict:
+    """Seconds for a one-month statement vs a full-history one on a large account"""
+    account = SavingsAccount("1001", "Benchmark")
+    start = time.time_ns() - count * 60 * 1_000_000_000
+    for i in range(count):                                  # one transaction a minute
+        account.ledger.record(TransactionType.DEPOSIT, 100, 100 * (i + 1), "Deposit", start + i * 60_000_000_000)
+    month_start = from_ns(start + count * 30_000_000_000)
+    timings = {}
+    for label, bounds in (("month", (month_start, month_start + timedelta(days=days))), ("full", (None, None))):
+        started = time.perf_counter()
+        account.get_statement(*bounds)
+        timings[label] = time.perf_counter() - started
+    return timings
+
+
+# ---------------- INTEREST ----------------
+
+def _interest_bank(accounts: int) -> Bank:
+    bank = Bank("Benchmark")
+    kinds = ("savings", "checking", "business")
+    for i in range(accounts):
+        bank.create_account(kinds[i % 3], f"owner{i}", Decimal(i % 100_000) / 7)
+    return bank
+
+
+def interest_posting(accounts: int = 300_000) -> dict:
+    """Seconds for month-end interest: per-account calculate_interest() vs the batch engine"""
+    looped, batched = _interest_bank(accounts), _interest_bank(accounts)
+    started = time.perf_counter()
+    for account in looped.accounts.values():
+        account.calculate_interest()
+    per_account = time.perf_counter() - started
+    started = time.perf_counter()
+    batched.apply_monthly_interest()
+    batch = time.perf_counter() - started
+    assert all(account.balance == batched.accounts[number].balance
+               for number, account in looped.accounts.items()), "batch interest differs from per-account path"
+    return {"accounts": accounts, "per_account": per_account, "batch": batch}
+
+
+# ---------------- CONCURRENT TRANSFERS ----------------
+
+def _total_with_fees(bank: Bank) -> Decimal:
+    """Sum of balances plus overdraft fees charged, which must equal the money put in"""
+    fee = list(TransactionType).index(TransactionType.FEE)
+    fees = sum(amount for account in bank.accounts.values()
+               for code, amount in zip(account.ledger.types, account.ledger.amounts) if code == fee)
+    return sum(account.balance for account in bank.accounts.values()) + Decimal(fees) / 100
+
+
+def transfer_stress(accounts: int = 50, threads: int = 8, transfers_per_thread: int = 20_000) -> dict:
+    """Random transfers from many threads (overdrafts included); checks money is conserved"""
+    bank = Bank("Stress")
+    kinds = ("savings", "checking", "business")
+    for i in range(accounts):
+        bank.create_account(kinds[i % 3], f"owner{i}", Decimal(1000))
+    numbers = list(bank.accounts)
+    before = _total_with_fees(bank)
+    succeeded = [0] * threads
+
+    def run(worker):
+        rng = random.Random(worker)
+        for _ in range(transfers_per_thread):
+            a, b = rng.sample(numbers, 2)
+            succeeded[worker] += bank.transfer(a, b, Decimal(rng.randint(1, 20_000)) / 100)
+
+    workers = [threading.Thread(target=run, args=(worker,)) for worker in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    after = _total_with_fees(bank)
+    assert before == after, f"money not conserved: {before} -> {after}"
+    return {"transfers": threads * transfers_per_thread, "succeeded": sum(succeeded), "total": after}
+
+
+def transfer_throughput(transfers: int = 100_000, accounts: int = 1000, worker_counts=(1, 2, 4, 8)) -> dict:
+    """Transfers/sec through Bank.submit_transfers for different pool sizes"""
+    rng = random.Random(7)
+    results = {}
+    for workers in worker_counts:
+        bank = Bank("Throughput", workers=workers)
+        for i in range(accounts):
+            bank.create_account("savings", f"owner{i}", Decimal(1_000_000))
+        numbers = list(bank.accounts)
+        batch = [(*rng.sample(numbers, 2), Decimal(rng.randint(1, 10_000)) / 100) for _ in range(transfers)]
+        started = time.perf_counter()
+        futures = bank.submit_transfers(batch)
+        for future in futures:
+            future.result()
+        results[workers] = transfers / (time.perf_counter() - started)
+        bank.shutdown()
+    return results
+
+
+def as_of_report(accounts: int = 20_000, rows_per_account: int = 100) -> dict:
+    """Seconds for a bank-wide as-of report: scanning balance_after vs Bank.balances_at"""
+    bank = Bank("Audit")
+    start = time.time_ns() - rows_per_account * 3_600_000_000_000
+    for i in range(accounts):
+        account = bank.create_account("savings", f"owner{i}")
+        account.opened_ns = start                           # back-dated history
+        ledger = account.ledger
+        for row in range(rows_per_account):                  # one deposit an hour
+            ledger.record(TransactionType.DEPOSIT, 100, 100 * (row + 1), "Deposit", start + row * 3_600_000_000_000)
+    when = from_ns(start + rows_per_account * 1_800_000_000_000)
+
+    started = time.perf_counter()
+    scanned = {}
+    for number, account in bank.accounts.items():
+        balance = Decimal("0")
+        for txn in account.transactions:
+            if txn.timestamp > when:
+                break
+            balance = txn.balance_after
+        scanned[number] = balance
+    scan = time.perf_counter() - started
+    started = time.perf_counter()
+    indexed = bank.balances_at(when)
+    index = time.perf_counter() - started
+    assert indexed == scanned
+    return {"accounts": accounts, "rows": accounts * rows_per_account, "scan": scan, "balances_at": index}
+
+
+# ---------------- BATCH PAYMENTS ----------------
+
+def batch_throughput(items: int = 50_000, accounts: int = 2000) -> dict:
+    """Transfers/sec: a CSV payroll run through execute_batch vs one transfer() per row"""
+    rng = random.Random(11)
+    lines = ["from,to,amount"]
+    for _ in range(items):
+        a, b = rng.sample(range(1001, 1001 + accounts), 2)
+        lines.append(f"{a},{b},{rng.randint(1, 5000) / 100:.2f}")
+    payload = "\n".join(lines) + "\n"
+    results = {}
+    for label in ("transfer", "execute_batch"):
+        bank = Bank("Payroll")
+        for i in range(accounts):
+            bank.create_account("checking", f"owner{i}", Decimal(100_000))
+        started = time.perf_counter()
+        if label == "transfer":
+            for from_account, to_account, amount in read_transfers_csv(io.StringIO(payload)):
+                bank.transfer(from_account, to_account, Decimal(amount))
+        else:
+            assert bank.execute_batch(read_transfers_csv(io.StringIO(payload))).committed
+        results[label] = items / (time.perf_counter() - started)
+    return results
+
+
+# ---------------- PERSISTENCE ----------------
+
+def recovery_time(accounts: int = 1_000_000, tail_transfers: int = 50_000) -> dict:
+    """Seconds to reopen a bank of `accounts` from its snapshot plus a log tail of transfers"""
+    directory = tempfile.mkdtemp(prefix="bank-recovery-")
+    try:
+        store = BankStore(directory, sync="off")
+        bank = store.open("Recovery")
+        for i in range(accounts):
+            bank.create_account("savings", f"owner{i}", Decimal(100))
+        started = time.perf_counter()
+        store.snapshot()
+        snapshot_seconds = time.perf_counter() - started
+        numbers = list(bank.accounts)
+        rng = random.Random(3)
+        for _ in range(tail_transfers):
+            bank.transfer(*rng.sample(numbers, 2), Decimal(1))
+        store.close()
+
+        started = time.perf_counter()
+        recovered = BankStore(directory).open()
+        seconds = time.perf_counter() - started
+        assert len(recovered.accounts) == accounts
+        sizes = {name: os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)}
+        return {"accounts": accounts, "tail_transfers": tail_transfers, "snapshot_seconds": snapshot_seconds,
+                "recovery_seconds": seconds, "file_mb": {name: size / 1e6 for name, size in sizes.items()}}
+    finally:
+        shutil.rmtree(directory)
+
+
+def commit_throughput(operations: int = 4000, thread_counts=(1, 8)) -> dict:
+    """Committed deposits/sec for each sync mode and number of client threads"""
+    results = {}
+    for sync in SYNC_MODES:
+        for threads in thread_counts:
+            directory = tempfile.mkdtemp(prefix="bank-commit-")
+            try:
+                store = BankStore(directory, sync=sync)
+                bank = store.open("Commit")
+                accounts = [bank.create_account("savings", f"owner{i}") for i in range(threads)]
+                per_thread = operations // threads
+
+                def run(account):
+                    for _ in range(per_thread):
+                        account.deposit(Decimal(1), "Deposit")
+
+                workers = [threading.Thread(target=run, args=(account,)) for account in accounts]
+                started = time.perf_counter()
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                results[(sync, threads)] = per_thread * threads / (time.perf_counter() - started)
+                store.close()
+            finally:
+                shutil.rmtree(directory)
+    return results
+
+
+# ---------------- SHARDING ----------------
+
+def shard_scaling(transfers: int = 100_000, accounts: int = 2000, chunk: int = 2000,
+                  shard_counts=(1, 2, 4)) -> dict:
+    """Transfers/sec through ShardedBank.transfer_many for different shard counts"""
+    rng = random.Random(5)
+    results = {}
+    for shards in shard_counts:
+        with ShardedBank(shards) as bank:
+            numbers = [bank.create_account("savings", f"owner{i}", Decimal(10_000)) for i in range(accounts)]
+            before = sum(entry["balance"] + entry["fees"] for entry in bank.stats().values())
+            rows = [(*rng.sample(numbers, 2), Decimal(rng.randint(1, 10_000)) / 100) for _ in range(transfers)]
+            started = time.perf_counter()
+            succeeded = 0
+            for start in range(0, transfers, chunk):
+                succeeded += sum(bank.transfer_many(rows[start:start + chunk]))
+            elapsed = time.perf_counter() - started
+            after = sum(entry["balance"] + entry["fees"] for entry in bank.stats().values())
+            assert before == after, "money not conserved across shards"
+            results[shards] = {"transfers_per_sec": transfers / elapsed, "succeeded": succeeded}
+    return results
+
+
+# ---------------- CHANGE FEED ----------------
+
+def change_feed_overhead(operations: int = 200_000, accounts: int = 1000) -> dict:
+    """Deposit/withdraw latency and rate with no feed, a synchronous feed and a background publisher
+
+    Every mode has one per-event listener and one batch listener. Latencies and
+    ops/sec cover the operations alone; `drained_sec` also counts delivering every event.
+    """
+    results = {}
+    for mode in ("none", "sync", "background"):
+        bank = Bank("Feed Bank")
+        numbers = [bank.create_account("savings", f"Owner {i}", Decimal("1000")).account_number
+                   for i in range(accounts)]
+        emitter = EventEmitter()
+        counted = [0]
+        emitter.on("transaction.*", lambda event: None)
+        emitter.on("transaction.*", lambda events: counted.__setitem__(0, counted[0] + len(events)), batch=True)
+        feed = None if mode == "none" else ChangeFeed(emitter, background=mode == "background").attach(bank)
+        rng = random.Random(5)
+        picks = [(bank.accounts[rng.choice(numbers)], Decimal(rng.randint(1, 5000)) / 100)
+                 for _ in range(operations)]
+        latencies = []
+        clock = time.perf_counter_ns
+        start = time.perf_counter()
+        for i, (account, amount) in enumerate(picks):
+            began = clock()
+            if i & 1:
+                account.withdraw(amount)
+            else:
+                account.deposit(amount)
+            latencies.append(clock() - began)
+        hot_path = time.perf_counter() - start
+        if feed is not None:
+            feed.close()
+        latencies.sort()
+        results[mode] = {"ops_per_sec": operations / hot_path,
+                         "p50_us": latencies[len(latencies) // 2] / 1000,
+                         "p99_us": latencies[int(len(latencies) * 0.99)] / 1000,
+                         "drained_sec": time.perf_counter() - start, "events": counted[0]}
+    return results
+
+
+# ---------------- SECONDARY INDEXES ----------------
+
+def _indexed_bank(accounts: int, indexed: bool) -> Bank:
+    bank = Bank("Index Bank", indexed=indexed)
+    rng = random.Random(9)
+    for i in range(accounts):
+        bank.create_account(("savings", "checking", "business")[i % 3], f"Owner {i % (accounts // 4)}",
+                            Decimal(rng.randint(0, 100_000)) / 100)
+    return bank
+
+
+def index_overhead(accounts: int = 300_000, operations: int = 200_000, queries: int = 200) -> dict:
+    """Deposit/withdraw cost with and without the indexes, and indexed lookups against full scans
+
+    `catch_up_ms` is the first balance query after the writes, which re-files
+    every account they moved; the query timings after it are steady state.
+    """
+    results = {}
+    for indexed in (False, True):
+        bank = _indexed_bank(accounts, indexed)
+        rng = random.Random(5)
+        numbers = list(bank.accounts)
+        picks = [(bank.accounts[rng.choice(numbers)], Decimal(rng.randint(1, 200_000)) / 100)
+                 for _ in range(operations)]
+        latencies = []
+        clock = time.perf_counter_ns
+        start = time.perf_counter()
+        for i, (account, amount) in enumerate(picks):
+            began = clock()
+            if i & 1:
+                account.withdraw(amount)
+            else:
+                account.deposit(amount)
+            latencies.append(clock() - began)
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        began = time.perf_counter()
+        bank.top_balances(10)
+        catch_up = time.perf_counter() - began
+
+        lookups = {
+            "owner": lambda: bank.accounts_of(f"Owner {rng.randrange(accounts // 4)}"),
+            "overdrawn checking": lambda: bank.overdrawn_accounts("checking"),
+            "top 10": lambda: bank.top_balances(10),
+        }
+        timings = {}
+        for name, lookup in lookups.items():
+            runs = queries if indexed or name == "owner" else max(1, queries // 20)
+            began = time.perf_counter()
+            for _ in range(runs):
+                found = lookup()
+            timings[name] = {"ms": (time.perf_counter() - began) / runs * 1000, "results": len(found)}
+        results["indexed" if indexed else "no index"] = {
+            "ops_per_sec": operations / elapsed, "p50_us": latencies[len(latencies) // 2] / 1000,
+            "p99_us": latencies[int(len(latencies) * 0.99)] / 1000, "catch_up_ms": catch_up * 1000,
+            "queries": timings,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    print("\n========== LEDGER MEMORY ==========")
+    stats = ledger_memory()
+    print(f"{stats['transactions']:,} transactions")
+    print(f"dataclass list | {stats['dataclass_bytes_per_txn']:7.1f} bytes/txn | "
+          f"{stats['dataclass_total_mb']:>9,.0f} MB (extrapolated)")
+    print(f"columnar       | {stats['columnar_bytes_per_txn']:7.1f} bytes/txn | "
+          f"{stats['columnar_total_mb']:>9,.0f} MB")
+    print(f"columnar appends: {stats['columnar_appends_per_sec']:,.0f}/sec")
+
+    print("\n========== STATEMENTS ==========")
+    for label, seconds in statement_range().items():
+        print(f"{label:5} statement | {seconds * 1000:9.1f} ms")
+
+    print("\n========== INTEREST ==========")
+    stats = interest_posting()
+    print(f"{stats['accounts']:,} accounts | per-account {stats['per_account']:.2f} s | "
+          f"batch {stats['batch']:.2f} s | identical balances")
+
+    print("\n========== CONCURRENT TRANSFERS ==========")
+    print("stress:", transfer_stress())
+    for workers, rate in transfer_throughput().items():
+        print(f"{workers} worker(s) | {rate:>10,.0f} transfers/sec")
+
+    stats = as_of_report()
+    print(f"as-of report, {stats['accounts']:,} accounts / {stats['rows']:,} rows | "
+          f"scan {stats['scan']:.2f} s | balances_at {stats['balances_at']:.3f} s")
+
+    print("\n========== BATCH PAYMENTS ==========")
+    for label, rate in batch_throughput().items():
+        print(f"{label:13} | {rate:>10,.0f} transfers/sec")
+
+    print("\n========== PERSISTENCE ==========")
+    for (sync, threads), rate in commit_throughput().items():
+        print(f"sync={sync:6} | {threads} thread(s) | {rate:>10,.0f} commits/sec")
+    stats = recovery_time()
+    print(f"{stats['accounts']:,} accounts + {stats['tail_transfers']:,} logged transfers | "
+          f"snapshot {stats['snapshot_seconds']:.1f} s | recovery {stats['recovery_seconds']:.1f} s")
+    print("files (MB):", {name: round(size, 1) for name, size in stats["file_mb"].items()})
+
+    print("\n========== SHARDING ==========")
+    for shards, stats in shard_scaling().items():
+        print(f"{shards} shard(s) | {stats['transfers_per_sec']:>10,.0f} transfers/sec | "
+              f"{stats['succeeded']:,} succeeded")
+
+    print("\n========== CHANGE FEED ==========")
+    for mode, stats in change_feed_overhead().items():
+        print(f"{mode:10} | p50 {stats['p50_us']:6.1f} us | p99 {stats['p99_us']:7.1f} us | "
+              f"{stats['ops_per_sec']:>9,.0f} ops/sec | all delivered {stats['drained_sec']:.2f} s | "
+              f"{stats['events']:,} events")
+
+    print("\n========== SECONDARY INDEXES ==========")
+    for mode, stats in index_overhead().items():
+        print(f"{mode:8} | deposit/withdraw p50 {stats['p50_us']:5.1f} us | p99 {stats['p99_us']:6.1f} us | "
+              f"{stats['ops_per_sec']:>9,.0f} ops/sec | first query after them {stats['catch_up_ms']:.0f} ms")
+        for name, query in stats["queries"].items():
+            print(f"         | {name:18} {query['ms']:9.3f} ms | {query['results']:,} accounts")
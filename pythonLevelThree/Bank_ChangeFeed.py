@@ -0,0 +1,227 @@
+# Bank Change Feed
+# Change-data capture for Bank in Bank_Account_System.py: every ledger row an operation
+# appends is published as an Event on an EventEmitter, one emit_many() per operation.
+#
+#   emitter = EventEmitter()
+#   emitter.on("transaction.*", notify)                      # one call per row
+#   emitter.on("transaction.*", fraud_check, batch=True)     # one call per operation: a transfer's
+#                                                            # TRANSFER_OUT, FEE and TRANSFER_IN together
+#   feed = ChangeFeed(emitter).attach(bank)
+#   bank.transfer("1001", "1002", Decimal("50"))
+#   feed.close()                                             # deliver what is queued, detach
+#
+# Event names: "account.opened" and "transaction.<type>" (deposit, withdrawal, transfer_in,
+# transfer_out, interest, fee). Data is a dict: account, seq (ledger row index), type, amount,
+# balance, description, timestamp_ns (epoch) and op, the operation number shared by one group.
+#
+# While it holds its account locks an operation only queues (account, first row, end row)
+# ranges, so the hot path never builds an Event and each account's rows are queued in ledger
+# order. With background=True (the default) a publisher thread turns them into Events and
+# emits them, and may do so before a journaled operation is durable; with background=False
+# the thread that ran the operation delivers the queue once its locks and durability wait are done.
+#
+# attach() also accepts a bankAccount models.Bank. Its @journaled methods mark where an
+# operation ends, so the feed speaks the storage.Journal protocol there (depth, create, row,
+# commit) and copies each row as it is recorded; that bank runs on one thread at a time.
+
+from collections import namedtuple
+from typing import Iterable, Optional, Tuple
+import itertools
+import queue
+import sys
+import threading
+import time
+
+from Bank_Account_System import DESCRIPTIONS, Account, TransactionType, from_minor
+from Event_DrivenArchitecture import Event, EventEmitter, to_monotonic_ns
+
+_TYPES = list(TransactionType)
+_NAMES = [f"transaction.{t_type.value}" for t_type in _TYPES]
+_WAKE = (0, [])                                             # Empty group; op 0 is never handed out
+_Opened = namedtuple("_Opened", "account owner kind balance timestamp_ns")      # models.Bank parts, paise
+_Row = namedtuple("_Row", "account seq type amount balance description timestamp_ns")
+
+
+class ChangeFeed:
+    """Publishes the ledger rows of every Bank operation to an EventEmitter"""
+
+    def __init__(self, emitter: EventEmitter = None, background: bool = True, source: str = "bank"):
+        self.emitter = emitter if emitter is not None else EventEmitter()
+        self.source = source                                # Event.source of every published event
+        self.published = 0                                  # Events every listener took without raising
+        self.failed = 0                                     # Events of batches a listener raised on
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()   # (op, [(account, lo, hi) or opened account])
+        self._held: Optional[Tuple[int, list]] = None       # Group read ahead while merging
+        self._ops = itertools.count(1)
+        self._deliver_lock = threading.RLock()
+        self._delivering = False                            # A listener's own bank call must not re-enter
+        self._banks: list = []
+        self.depth = 0                                      # Nesting of models' @journaled calls
+        self._pending: list = []                            # models.Bank parts of the running operation
+        self._closing = False
+        self._publisher: Optional[threading.Thread] = None
+        if background:
+            self._publisher = threading.Thread(target=self._run, name="bank-change-feed", daemon=True)
+            self._publisher.start()
+
+    def attach(self, bank) -> "ChangeFeed":
+        """Publish the bank's operations from now on; rows already in the ledgers are not replayed"""
+        bank.feed = self
+        for account in bank.accounts.values():
+            if isinstance(account, Account):
+                account._feed = self
+                account._published = len(account.ledger)
+            else:
+                account.feed = self
+        self._banks.append(bank)
+        return self
+
+    # ---------------- CAPTURE (caller holds the account locks) ----------------
+    def capture(self, accounts: Iterable[Account], op: int = 0) -> int:
+        """Queue the unpublished rows of accounts as one group, returns its op number
+
+        Passing the op of an earlier capture continues that group; consecutive
+        parts of one op are emitted together (post_monthly_interest does this).
+        """
+        parts = []
+        for account in dict.fromkeys(accounts):
+            end = len(account.ledger)
+            if account._published < end:
+                parts.append((account, account._published, end))
+                account._published = end
+        if parts:
+            op = op or next(self._ops)
+            self._queue.put((op, parts))
+        return op
+
+    def opened(self, account: Account) -> None:
+        """Queue an account.opened event and start following the account"""
+        account._feed = self
+        account._published = len(account.ledger)
+        self._queue.put((next(self._ops), [account]))
+
+    # ---------------- CAPTURE (bankAccount models.Bank, storage.Journal protocol) ----------------
+    def create(self, account) -> None:
+        self._pending.append(_Opened(account.account_number, account.owner, type(account).__name__,
+                                     account._cents, time.time_ns()))
+
+    def row(self, account, t_type, amount_minor: int, description: str) -> None:
+        ledger = account.transactions
+        self._pending.append(_Row(account.account_number, len(ledger) - 1, t_type.value, amount_minor,
+                                  account._cents, description, ledger.timestamps[-1]))
+
+    def commit(self) -> None:
+        """End of an outermost @journaled call: its rows become one group"""
+        if self._pending:
+            self._queue.put((next(self._ops), self._pending))
+            self._pending = []
+            self.deliver()
+
+    # ---------------- DELIVERY ----------------
+    def deliver(self) -> None:
+        """Emit everything queued on the calling thread; a no-op with a background publisher"""
+        if self._publisher is not None:
+            return
+        with self._deliver_lock:
+            if self._delivering:
+                return                                      # The outer deliver() picks it up
+            self._delivering = True
+            try:
+                while True:
+                    group = self._take(block=False)
+                    if group is None:
+                        break
+                    self._emit(group)
+            finally:
+                self._delivering = False
+
+    def _take(self, block: bool) -> Optional[Tuple[int, list]]:
+        """Next group with any directly following parts of the same op merged in, None if empty"""
+        group, self._held = self._held, None
+        if group is None:
+            try:
+                group = self._queue.get(block)
+            except queue.Empty:
+                return None
+        while True:
+            try:
+                following = self._queue.get_nowait()
+            except queue.Empty:
+                return group
+            if following[0] != group[0] or not group[0]:
+                self._held = following
+                return group
+            group[1].extend(following[1])
+
+    def _emit(self, group: Tuple[int, list]) -> None:
+        op, parts = group
+        events = []
+        for part in parts:
+            if isinstance(part, Account):
+                part = _Opened(part.account_number, part.owner, type(part).__name__,
+                               part._opening_minor, part.opened_ns)
+            if isinstance(part, _Opened):
+                events.append(Event("account.opened", {
+                    "account": part.account, "owner": part.owner, "kind": part.kind,
+                    "balance": from_minor(part.balance), "timestamp_ns": part.timestamp_ns, "op": op,
+                }, source=self.source, timestamp_ns=to_monotonic_ns(part.timestamp_ns)))
+            elif isinstance(part, _Row):
+                events.append(Event(f"transaction.{part.type}", {
+                    "account": part.account, "seq": part.seq, "type": part.type,
+                    "amount": from_minor(part.amount), "balance": from_minor(part.balance),
+                    "description": part.description, "timestamp_ns": part.timestamp_ns, "op": op,
+                }, source=self.source, timestamp_ns=to_monotonic_ns(part.timestamp_ns)))
+            else:
+                account, lo, hi = part
+                ledger = account.ledger
+                number = account.account_number
+                for i in range(lo, hi):
+                    stamp = ledger.timestamps[i]
+                    t_type = _TYPES[ledger.types[i]]
+                    events.append(Event(_NAMES[ledger.types[i]], {
+                        "account": number, "seq": i, "type": t_type.value,
+                        "amount": from_minor(ledger.amounts[i]), "balance": from_minor(ledger.balances[i]),
+                        "description": DESCRIPTIONS.texts[ledger.descriptions[i]], "timestamp_ns": stamp,
+                        "op": op,
+                    }, source=self.source, timestamp_ns=to_monotonic_ns(stamp)))
+        if not events:
+            return
+        try:
+            self.emitter.emit_many(events)
+        except Exception as e:
+            self.failed += len(events)
+            print(f"Error in change feed listener: {e!r}", file=sys.stderr)
+        else:
+            self.published += len(events)
+
+    def _run(self) -> None:
+        while True:
+            group = self._take(block=True)
+            if group[1]:
+                self._emit(group)
+            if self._closing and self._held is None and self._queue.empty():
+                return
+
+    def close(self) -> None:
+        """Deliver everything queued, stop the publisher and detach from the banks"""
+        for bank in self._banks:
+            bank.feed = None
+            for account in bank.accounts.values():
+                if isinstance(account, Account):
+                    account._feed = None
+                else:
+                    account.feed = None
+        self._banks = []
+        if self._publisher is not None:
+            self._closing = True
+            self._queue.put(_WAKE)
+            self._publisher.join()
+            self._publisher = None
+        else:
+            self.deliver()
+
+    def __enter__(self) -> "ChangeFeed":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
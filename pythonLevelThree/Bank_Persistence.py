@@ -0,0 +1,476 @@
+# Bank Persistence
+# Write-ahead log and binary snapshots for Bank in Bank_Account_System.py,
+# so a crash loses no committed operation.
+#
+#   store = BankStore("bank_data", sync="group")
+#   bank = store.open("Demo National Bank")       # latest snapshot + log tail, or a new bank
+#   bank.create_account("savings", "Suraj", Decimal("1000"))   # journaled before it returns
+#   store.snapshot()                              # compact state, start a new log generation
+#   store.close()
+#
+# Directory layout (one generation per snapshot):
+#   snapshot-00000003.bin   state at the start of generation 3
+#   wal-00000003.log        frames committed during generation 3
+#
+# The log is physical redo: every committed operation (create, deposit, withdraw,
+# transfer, interest) is written as the ledger rows it appended, so replay needs
+# no business logic and re-applying a row that is already present is a no-op.
+#
+# Frame: <II> payload length, crc32 of payload; the payload is a run of entries
+#   C  account created   acc_no, class name, owner, opening balance (paise), opened at (ns)
+#   D  description       id, text (ids are only meaningful inside one log file)
+#   R  ledger rows       acc_no, first row index, count, then the five columns
+# A transfer's rows for both accounts share one frame, so it replays whole or not at all.
+
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+import gc
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from Bank_Account_System import (
+    DESCRIPTIONS, Account, Bank, BusinessAccount, CheckingAccount, SavingsAccount,
+)
+
+_FRAME = struct.Struct("<II")                               # payload length, crc32
+_CREATE = struct.Struct("<qq")                              # opening balance, opened at (epoch ns)
+_DESCRIPTION = struct.Struct("<I")                          # description id
+_ROWS = struct.Struct("<QI")                                # first row index, row count
+_STRING = struct.Struct("<H")                               # length prefix of every string
+_SNAPSHOT = struct.Struct("<4sH?IQQI")                      # magic, version, little-endian, generation,
+                                                            # next account number, accounts, descriptions
+_ACCOUNT = struct.Struct("<HHH?qqqQ")                       # number, class and owner lengths, active, balance,
+                                                            # opening balance, opened at, rows
+_MAGIC = b"BNKS"
+_VERSION = 2
+_COLUMNS = ("amounts", "types", "timestamps", "balances", "descriptions")
+_ACCOUNT_CLASSES = {cls.__name__: cls for cls in (SavingsAccount, CheckingAccount, BusinessAccount)}
+SYNC_MODES = ("always", "group", "async", "off")
+
+
+def _pack_string(text: str) -> bytes:
+    raw = text.encode()
+    return _STRING.pack(len(raw)) + raw
+
+
+def _unpack_string(buffer, position: int) -> Tuple[str, int]:
+    (length,) = _STRING.unpack_from(buffer, position)
+    position += _STRING.size
+    return bytes(buffer[position:position + length]).decode(), position + length
+
+
+# ---------------- WRITE-AHEAD LOG ----------------
+
+class WriteAheadLog:
+    """Append-only journal of committed ledger rows with configurable durability
+
+    sync="always"  write and fsync inside every commit (safest, slowest)
+    sync="group"   a flusher thread writes and fsyncs whatever has queued up;
+                   committers wait for their frame, so one fsync covers many commits
+    sync="async"   same flusher, committers do not wait (loses at most one flush window)
+    sync="off"     flusher writes to the OS without fsync (survives process crashes only)
+    """
+
+    def __init__(self, path: str, sync: str = "group", group_interval: float = 0.0):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"sync must be one of {SYNC_MODES}")
+        self.path = path
+        self.sync = sync
+        self.group_interval = group_interval                # Extra wait to let a group form
+        self._file = open(path, "ab")
+        self._known = set()                                 # Description ids defined in this file
+        self._buffer: List[bytes] = []
+        self._appended = 0                                  # Frames handed to the log
+        self._durable = 0                                   # Frames written (and synced)
+        self._closed = False
+        self._lock = threading.Lock()
+        self._pending = threading.Condition(self._lock)     # Flusher waits for frames
+        self._flushed = threading.Condition(self._lock)     # Committers wait for the flusher
+        self._io_lock = threading.Lock()                    # One writer of the file at a time
+        self._flusher = None
+        if sync != "always":
+            self._flusher = threading.Thread(target=self._flush_loop, name="wal-flusher", daemon=True)
+            self._flusher.start()
+
+    # ---------------- ENCODING ----------------
+    def _rows_entry(self, account: Account, parts: List[bytes]) -> None:
+        """Append D entries for new description ids and one R entry for unjournaled rows"""
+        ledger = account.ledger
+        start, end = account._journaled, len(ledger)
+        if start >= end:
+            return
+        descriptions = ledger.descriptions[start:end]
+        for text_id in set(descriptions) - self._known:
+            self._known.add(text_id)
+            parts.append(b"D" + _DESCRIPTION.pack(text_id) + _pack_string(DESCRIPTIONS.texts[text_id]))
+        parts.append(b"R" + _pack_string(account.account_number) + _ROWS.pack(start, end - start))
+        for name in _COLUMNS[:-1]:
+            parts.append(getattr(ledger, name)[start:end].tobytes())
+        parts.append(descriptions.tobytes())
+        account._journaled = end
+
+    def capture(self, accounts) -> int:
+        """Journal the new rows of accounts (locks held by the caller) as one frame
+
+        Returns a commit number to pass to wait(), or 0 when there is nothing to wait for.
+        """
+        with self._lock:
+            parts: List[bytes] = []
+            for account in dict.fromkeys(accounts):
+                self._rows_entry(account, parts)
+            return self._append(b"".join(parts)) if parts else 0
+
+    def create(self, account: Account) -> int:
+        """Journal a new account (and any rows it already has)"""
+        with self._lock:
+            parts = [b"C" + _pack_string(account.account_number) + _pack_string(type(account).__name__)
+                     + _pack_string(account.owner) + _CREATE.pack(account._opening_minor, account.opened_ns)]
+            self._rows_entry(account, parts)
+            return self._append(b"".join(parts))
+
+    def _append(self, payload: bytes) -> int:
+        """Queue (or, with sync="always", write) one frame; called with the lock held"""
+        if self._closed:
+            raise ValueError("write-ahead log is closed")
+        frame = _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        self._appended += 1
+        if self.sync == "always":
+            self._file.write(frame)                         # the buffer stays empty in this mode
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._durable = self._appended
+            return 0
+        self._buffer.append(frame)
+        self._pending.notify()
+        return self._appended if self.sync == "group" else 0
+
+    # ---------------- FLUSHING ----------------
+    def _flush_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._buffer and not self._closed:
+                    self._pending.wait()
+                if not self._buffer and self._closed:
+                    return
+            if self.group_interval:
+                time.sleep(self.group_interval)
+            self._write_out()
+
+    def _write_out(self) -> None:
+        """Write every queued frame with a single write (and fsync)"""
+        with self._io_lock:
+            with self._lock:
+                frames, self._buffer = self._buffer, []
+                upto = self._appended
+            if frames:
+                self._file.write(b"".join(frames))
+                self._file.flush()
+                if self.sync != "off":
+                    os.fsync(self._file.fileno())
+        with self._lock:
+            self._durable = max(self._durable, upto)
+            self._flushed.notify_all()
+
+    def wait(self, commit: int) -> None:
+        """Block until frame `commit` is on disk"""
+        with self._lock:
+            while self._durable < commit:
+                self._flushed.wait()
+
+    def flush(self) -> None:
+        """Write (and sync) everything appended so far"""
+        self._write_out()
+
+    def rotate(self, path: str) -> None:
+        """Finish this file and continue in a new one"""
+        with self._io_lock:
+            with self._lock:
+                frames, self._buffer = self._buffer, []
+                upto = self._appended
+                self._file.write(b"".join(frames))
+                self._file.flush()
+                if self.sync != "off":
+                    os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = open(path, "ab")
+                self.path = path
+                self._known = set()
+                self._durable = max(self._durable, upto)
+                self._flushed.notify_all()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._pending.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+        self._write_out()
+        self._file.close()
+
+
+def read_frames(path: str) -> Iterator[Tuple[int, bytes]]:
+    """Yield (end position, payload) for each intact frame; stops at the first torn one"""
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    view = memoryview(raw)
+    position = 0
+    while position + _FRAME.size <= len(raw):
+        length, crc = _FRAME.unpack_from(raw, position)
+        start = position + _FRAME.size
+        if start + length > len(raw) or zlib.crc32(view[start:start + length]) != crc:
+            return
+        position = start + length
+        yield position, view[start:position]
+
+
+# ---------------- SNAPSHOTS ----------------
+
+def write_snapshot(bank: Bank, path: str, generation: int) -> None:
+    """Write the bank's full state to path atomically (temp file, fsync, rename)
+
+    Each account is copied under its own lock; column arrays are dumped as raw
+    native-endian bytes, so loading is a handful of frombytes() calls per account.
+    """
+    accounts = list(bank.accounts.values())
+    texts = list(DESCRIPTIONS.texts)
+    temp = path + ".tmp"
+    with open(temp, "wb") as fh:
+        fh.write(_SNAPSHOT.pack(_MAGIC, _VERSION, sys.byteorder == "little", generation,
+                                bank._next_acc_number, len(accounts), len(texts)))
+        fh.write(_pack_string(bank.name))
+        fh.write(b"".join(_pack_string(text) for text in texts))
+        for account in accounts:
+            with account._lock:
+                ledger = account.ledger
+                number, cls_name, owner = (account.account_number.encode(), type(account).__name__.encode(),
+                                           account.owner.encode())
+                fh.write(_ACCOUNT.pack(len(number), len(cls_name), len(owner), account.is_active,
+                                       account._balance_minor, account._opening_minor, account.opened_ns,
+                                       len(ledger)) + number + cls_name + owner)
+                for name in _COLUMNS:
+                    fh.write(getattr(ledger, name).tobytes())
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(temp, path)
+
+
+def _new_account(cls_name: str, account_number: str, owner: str, balance: int,
+                 opening: int, opened_ns: int) -> Account:
+    account = _ACCOUNT_CLASSES[cls_name](account_number, owner)
+    account._balance_minor = balance
+    account._opening_minor = opening
+    account.opened_ns = opened_ns
+    return account
+
+
+def load_snapshot(path: str, workers: int = 8) -> Tuple[Bank, int]:
+    """Rebuild a Bank from a snapshot file, returns (bank, generation)"""
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    view = memoryview(raw)
+    magic, version, little, generation, next_number, count, text_count = _SNAPSHOT.unpack_from(raw, 0)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f"{path} is not a version {_VERSION} bank snapshot")
+    if little != (sys.byteorder == "little"):
+        raise ValueError(f"{path} was written on a machine with the other byte order")
+    position = _SNAPSHOT.size
+    name, position = _unpack_string(view, position)
+    mapping = []
+    for _ in range(text_count):
+        text, position = _unpack_string(view, position)
+        mapping.append(DESCRIPTIONS.intern(text))
+
+    remap = mapping != list(range(len(mapping)))          # ids differ from the writer's
+    widths = [(column, array(code).itemsize) for column, code in zip(_COLUMNS, "qBqqI")]
+
+    bank = Bank(name, workers=workers)
+    bank._next_acc_number = next_number
+    accounts = bank.accounts
+    unpack = _ACCOUNT.unpack_from
+    for _ in range(count):
+        number_len, cls_len, owner_len, active, balance, opening, opened_ns, rows = unpack(raw, position)
+        position += _ACCOUNT.size
+        account_number = raw[position:position + number_len].decode()
+        position += number_len
+        cls_name = raw[position:position + cls_len].decode()
+        position += cls_len
+        owner = raw[position:position + owner_len].decode()
+        position += owner_len
+        account = _new_account(cls_name, account_number, owner, balance, opening, opened_ns)
+        account.is_active = active
+        ledger = account.ledger
+        for column, width in widths:
+            end = position + rows * width
+            getattr(ledger, column).frombytes(view[position:end])
+            position = end
+        if remap:
+            ledger.descriptions = array("I", [mapping[text_id] for text_id in ledger.descriptions])
+        accounts[account_number] = account
+    return bank, generation
+
+
+# ---------------- RECOVERY ----------------
+
+def replay_log(bank: Bank, path: str) -> int:
+    """Apply every intact frame of a log file to bank, truncating a torn tail; returns frames applied"""
+    mapping: Dict[int, int] = {}
+    applied = valid_end = 0
+    for valid_end, payload in read_frames(path):
+        position = 0
+        while position < len(payload):
+            tag = payload[position:position + 1].tobytes()
+            position += 1
+            if tag == b"C":
+                account_number, position = _unpack_string(payload, position)
+                cls_name, position = _unpack_string(payload, position)
+                owner, position = _unpack_string(payload, position)
+                opening, opened_ns = _CREATE.unpack_from(payload, position)
+                position += _CREATE.size
+                if account_number not in bank.accounts:
+                    bank.accounts[account_number] = _new_account(cls_name, account_number, owner,
+                                                                 opening, opening, opened_ns)
+                    if account_number.isdigit():
+                        bank._next_acc_number = max(bank._next_acc_number,
+                                                     int(account_number) + bank._acc_number_stride)
+            elif tag == b"D":
+                (text_id,) = _DESCRIPTION.unpack_from(payload, position)
+                text, position = _unpack_string(payload, position + _DESCRIPTION.size)
+                mapping[text_id] = DESCRIPTIONS.intern(text)
+            elif tag == b"R":
+                account_number, position = _unpack_string(payload, position)
+                start, rows = _ROWS.unpack_from(payload, position)
+                position += _ROWS.size
+                account = bank.accounts[account_number]
+                position = _apply_rows(account, start, rows, payload, position, mapping)
+            else:
+                raise ValueError(f"{path}: unknown log entry {tag!r}")
+        applied += 1
+    if valid_end != os.path.getsize(path):
+        with open(path, "r+b") as fh:
+            fh.truncate(valid_end)
+    return applied
+
+
+def _apply_rows(account: Account, start: int, rows: int, payload, position: int,
+                mapping: Dict[int, int]) -> int:
+    """Append the rows of one R entry the ledger does not have yet, returns the next position"""
+    ledger = account.ledger
+    have = len(ledger)
+    if start > have:
+        raise ValueError(f"log gap for account {account.account_number}: row {start}, ledger has {have}")
+    skip = have - start                                     # rows already restored (snapshot overlap)
+    for column in _COLUMNS:
+        target = getattr(ledger, column)
+        end = position + rows * target.itemsize
+        if skip < rows:
+            chunk = payload[position + skip * target.itemsize:end]
+            if column == "descriptions":
+                ids = array("I")
+                ids.frombytes(chunk)
+                target.extend(mapping[text_id] for text_id in ids)
+            else:
+                target.frombytes(chunk)
+        position = end
+    if skip < rows:
+        account._balance_minor = ledger.balances[-1]
+    return position
+
+
+class BankStore:
+    """Durable home for one Bank: snapshot + write-ahead log generations in a directory"""
+
+    def __init__(self, directory: str, sync: str = "group", group_interval: float = 0.0,
+                 snapshot_interval: float = None):
+        self.directory = directory
+        self.sync = sync                                    # See WriteAheadLog
+        self.group_interval = group_interval
+        self.snapshot_interval = snapshot_interval          # Seconds between automatic snapshots
+        self.generation = 0
+        self.bank: Optional[Bank] = None
+        self.journal: Optional[WriteAheadLog] = None
+        self._snapshot_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._snapshotter = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, kind: str, generation: int) -> str:
+        suffix = ".bin" if kind == "snapshot" else ".log"
+        return os.path.join(self.directory, f"{kind}-{generation:08d}{suffix}")
+
+    def _generations(self, kind: str) -> List[int]:
+        prefix = f"{kind}-"
+        suffix = ".bin" if kind == "snapshot" else ".log"
+        return sorted(int(name[len(prefix):-len(suffix)]) for name in os.listdir(self.directory)
+                      if name.startswith(prefix) and name.endswith(suffix))
+
+    def open(self, name: str = "Bank", workers: int = 8) -> Bank:
+        """Recover the bank (latest snapshot, then every newer log) and start journaling"""
+        # Recovery allocates millions of acyclic objects; cyclic GC passes would only slow it down
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            snapshots = self._generations("snapshot")
+            if snapshots:
+                bank, self.generation = load_snapshot(self._path("snapshot", snapshots[-1]), workers)
+            else:
+                bank, self.generation = Bank(name, workers=workers), 0
+            for generation in self._generations("wal"):
+                if generation >= self.generation:
+                    replay_log(bank, self._path("wal", generation))
+                    self.generation = generation
+            if bank.index is not None:
+                bank.rebuild_indexes()                      # recovery adds accounts behind create_account
+        finally:
+            if collecting:
+                gc.enable()
+
+        self.journal = WriteAheadLog(self._path("wal", self.generation), self.sync, self.group_interval)
+        bank.journal = self.journal
+        for account in bank.accounts.values():
+            account._journal = self.journal
+            account._journaled = len(account.ledger)
+        self.bank = bank
+        if self.snapshot_interval:
+            self._snapshotter = threading.Thread(target=self._snapshot_loop, name="bank-snapshots", daemon=True)
+            self._snapshotter.start()
+        return bank
+
+    def snapshot(self) -> str:
+        """Start a new log generation, write its snapshot and drop older generations"""
+        with self._snapshot_lock:
+            generation = self.generation + 1
+            self.journal.rotate(self._path("wal", generation))
+            self.generation = generation
+            path = self._path("snapshot", generation)
+            write_snapshot(self.bank, path, generation)
+            for kind in ("snapshot", "wal"):
+                for old in self._generations(kind):
+                    if old < generation:
+                        os.remove(self._path(kind, old))
+            return path
+
+    def _snapshot_loop(self) -> None:
+        while not self._stop.wait(self.snapshot_interval):
+            self.snapshot()
+
+    def close(self) -> None:
+        """Stop automatic snapshots and flush the log"""
+        self._stop.set()
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+        if self.journal is not None:
+            self.journal.close()
+            self.bank.journal = None
+            for account in self.bank.accounts.values():
+                account._journal = None
+            self.journal = None
+
+    def __enter__(self) -> "BankStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,332 @@
+# Sharded Bank
+# Spreads accounts over worker processes so banking work is not bound to one core by the GIL.
+#
+#   bank = ShardedBank(shards=4)
+#   a = bank.create_account("savings", "Suraj", Decimal("1000"))   # placed round-robin
+#   b = bank.create_account("checking", "Ravi")
+#   bank.transfer(a, b, Decimal("250"))          # same shard: local; else two-phase commit
+#   bank.transfer_many(rows)                     # pipelined: one round trip per shard per phase
+#   bank.close()
+#
+# Routing: an account lives on shard int(account_number) % shards. Shard k numbers its
+# accounts k, k + n, k + 2n, ... (n = shards) starting at 1001 or above, so IDs are
+# allocated locally with no shared counter and the number alone names the owner.
+#
+# Cross-shard transfer (two-phase commit driven by the coordinator):
+#   prepare  sender shard validates funds / overdraft rules and places a hold,
+#            receiver shard checks the account can be credited; both vote
+#   commit   both votes yes: sender posts TRANSFER_OUT (+ FEE), receiver TRANSFER_IN
+#   abort    otherwise: the hold is released, nothing is posted
+# A same-shard transfer posts exactly the same rows in one step, so statements and
+# interest do not depend on where the two accounts were placed.
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+import itertools
+import multiprocessing
+import pickle
+import zlib
+
+from Bank_Account_System import (Bank, BusinessAccount, CheckingAccount, SavingsAccount, TransactionType,
+                                 from_minor, to_minor)
+
+_STOP = None                                                # Sentinel telling a shard to exit
+_WITHDRAWALS = {                                            # Row description each account's withdraw() posts
+    SavingsAccount: "Savings withdrawal",
+    CheckingAccount: "Checking withdrawal",
+    BusinessAccount: "Business withdrawal",
+}
+
+
+class _Failure:
+    """Reply standing in for an operation that raised; falsy, so it counts as a no vote"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+    def __bool__(self) -> bool:
+        return False
+
+
+def _run_op(shard: "_Shard", op: str, args: tuple):
+    try:
+        return getattr(shard, f"do_{op}")(*args)
+    except Exception as e:
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(f"{type(e).__name__}: {e}")
+        return _Failure(e)
+
+
+_FIRST_NUMBER = 1001
+
+
+def shard_of(account_number: str, shards: int) -> int:
+    """Shard owning an account number"""
+    if account_number.isdigit():
+        return int(account_number) % shards
+    return zlib.crc32(account_number.encode()) % shards
+
+
+class _Shard:
+    """One shard's Bank plus the holds and votes of its open two-phase commits"""
+
+    def __init__(self, bank: Bank):
+        self.bank = bank
+        self.holds: Dict[str, int] = defaultdict(int)       # Paise reserved by prepared debits
+        self.prepared: Dict[int, Tuple] = {}                # txid -> (side, account, amount, fee, peer)
+
+    def _fee(self, account, amount: int) -> Optional[int]:
+        """Debit fee against the balance not held by prepared transfers, None if refused"""
+        return account._debit_fee(account._balance_minor - self.holds.get(account.account_number, 0), amount)
+
+    # ---------------- SINGLE-SHARD OPERATIONS ----------------
+    def do_create(self, kind: str, owner: str, opening: int) -> str:
+        return self.bank.create_account(kind, owner, from_minor(opening)).account_number
+
+    def do_deposit(self, number: str, amount: int) -> bool:
+        account = self.bank.accounts.get(number)
+        return account is not None and account.deposit(from_minor(amount))
+
+    def do_withdraw(self, number: str, amount: int) -> bool:
+        """Posts the rows account.withdraw() would, fee and funds judged on the unheld balance"""
+        account = self.bank.accounts.get(number)
+        if account is None or amount <= 0:
+            return False
+        with account._lock:
+            fee = self._fee(account, amount)
+            if fee is None:
+                return False
+            description = "Overdraft withdrawal" if fee else _WITHDRAWALS[type(account)]
+            self._post_debit(account, amount, fee, TransactionType.WITHDRAWAL, description)
+        return True
+
+    def do_transfer(self, sender: str, receiver: str, amount: int) -> bool:
+        """Same-shard transfer: posts the rows a two-phase commit would, fee taken on the unheld balance"""
+        debit, credit = self.bank.accounts.get(sender), self.bank.accounts.get(receiver)
+        if debit is None or credit is None or amount <= 0:
+            return False
+        first, second = sorted((debit, credit), key=lambda account: account.account_number)
+        with first._lock, second._lock:
+            if not (debit.is_active and credit.is_active):
+                return False
+            fee = self._fee(debit, amount)
+            if fee is None:
+                return False
+            self._post_debit(debit, amount, fee, TransactionType.TRANSFER_OUT, f"Transfer to {receiver}")
+            self._post_credit(credit, amount, sender)
+        return True
+
+    def do_balance(self, number: str) -> Optional[int]:
+        account = self.bank.accounts.get(number)
+        return None if account is None else account._balance_minor
+
+    def do_totals(self) -> Dict[str, int]:
+        """Account count, balance sum and overdraft fees charged, for conservation checks"""
+        fee = list(TransactionType).index(TransactionType.FEE)
+        accounts = self.bank.accounts.values()
+        return {
+            "accounts": len(self.bank.accounts),
+            "balance": sum(account._balance_minor for account in accounts),
+            "fees": sum(amount for account in accounts
+                        for code, amount in zip(account.ledger.types, account.ledger.amounts) if code == fee),
+            "open_transactions": len(self.prepared),
+        }
+
+    # ---------------- TWO-PHASE COMMIT ----------------
+    def do_prepare_debit(self, txid: int, number: str, amount: int, peer: str) -> bool:
+        account = self.bank.accounts.get(number)
+        if account is None or not account.is_active:
+            return False
+        fee = self._fee(account, amount)
+        if fee is None:
+            return False
+        self.holds[number] += amount + fee
+        self.prepared[txid] = ("debit", account, amount, fee, peer)
+        return True
+
+    def do_prepare_credit(self, txid: int, number: str, amount: int, peer: str) -> bool:
+        account = self.bank.accounts.get(number)
+        if account is None or not account.is_active:
+            return False
+        self.prepared[txid] = ("credit", account, amount, 0, peer)
+        return True
+
+    def _release(self, account, amount: int) -> None:
+        number = account.account_number
+        self.holds[number] -= amount
+        if not self.holds[number]:
+            del self.holds[number]
+
+    @staticmethod
+    def _post_debit(account, amount: int, fee: int, kind: TransactionType, description: str) -> None:
+        with account._operation():
+            account._balance_minor -= amount
+            account._post(kind, amount, description)
+            if fee:
+                account._balance_minor -= fee
+                account._post(TransactionType.FEE, fee, "Overdraft fee")
+
+    @staticmethod
+    def _post_credit(account, amount: int, peer: str) -> None:
+        with account._operation():
+            account._balance_minor += amount
+            account._post(TransactionType.TRANSFER_IN, amount, f"Transfer from {peer}")
+
+    def do_commit(self, txid: int) -> bool:
+        side, account, amount, fee, peer = self.prepared.pop(txid)
+        if side == "debit":
+            with account._lock:
+                self._release(account, amount + fee)
+                self._post_debit(account, amount, fee, TransactionType.TRANSFER_OUT, f"Transfer to {peer}")
+        else:
+            self._post_credit(account, amount, peer)
+        return True
+
+    def do_abort(self, txid: int) -> bool:
+        prepared = self.prepared.pop(txid, None)
+        if prepared is not None and prepared[0] == "debit":
+            _, account, amount, fee, _ = prepared
+            self._release(account, amount + fee)
+        return True
+
+
+def _shard_main(conn, index: int, shards: int, name: str) -> None:
+    """Shard process loop: run each batch of operations in order, reply with their results"""
+    bank = Bank(f"{name} #{index}")
+    first = _FIRST_NUMBER + (index - _FIRST_NUMBER) % shards  # smallest number >= 1001 owned by this shard
+    bank._next_acc_number = first
+    bank._acc_number_stride = shards
+    shard = _Shard(bank)
+    while True:
+        batch = conn.recv()
+        if batch is _STOP:
+            break
+        conn.send([_run_op(shard, op, args) for op, *args in batch])
+    conn.close()
+
+
+class ShardedBank:
+    """Coordinator for a bank split across `shards` worker processes"""
+
+    def __init__(self, shards: int = 4, name: str = "Sharded Bank", start_method: str = None):
+        context = multiprocessing.get_context(start_method)
+        self.shards = shards
+        self._conns = []
+        self._processes = []
+        for index in range(shards):
+            parent, child = context.Pipe()
+            process = context.Process(target=_shard_main, args=(child, index, shards, name), daemon=True)
+            process.start()
+            self._conns.append(parent)
+            self._processes.append(process)
+        self._txids = itertools.count(1)
+        self._placement = itertools.cycle(range(shards))    # Shard for the next new account
+
+    def shard_of(self, account_number: str) -> int:
+        return shard_of(account_number, self.shards)
+
+    def _round(self, requests: Dict[int, List[tuple]]) -> Dict[int, List]:
+        """Send every shard its batch, then collect the replies, so shards work in parallel"""
+        for shard, batch in requests.items():
+            self._conns[shard].send(batch)
+        return {shard: self._conns[shard].recv() for shard in requests}
+
+    def _call(self, shard: int, op: str, *args):
+        """One operation on one shard; an exception raised in the shard is re-raised here"""
+        reply = self._round({shard: [(op, *args)]})[shard][0]
+        if isinstance(reply, _Failure):
+            raise reply.error
+        return reply
+
+    # ---------------- ACCOUNTS ----------------
+    def create_account(self, account_type: str, owner: str, initial_deposit: Decimal = Decimal("0")) -> str:
+        """Open an account on the next shard, returns its number"""
+        return self._call(next(self._placement), "create", account_type, owner, to_minor(initial_deposit))
+
+    def deposit(self, account_number: str, amount: Decimal) -> bool:
+        return self._call(self.shard_of(account_number), "deposit", account_number, to_minor(amount))
+
+    def withdraw(self, account_number: str, amount: Decimal) -> bool:
+        return self._call(self.shard_of(account_number), "withdraw", account_number, to_minor(amount))
+
+    def balance(self, account_number: str) -> Optional[Decimal]:
+        minor = self._call(self.shard_of(account_number), "balance", account_number)
+        return None if minor is None else from_minor(minor)
+
+    # ---------------- TRANSFERS ----------------
+    def transfer(self, from_account: str, to_account: str, amount: Decimal) -> bool:
+        return self.transfer_many([(from_account, to_account, amount)])[0]
+
+    def transfer_many(self, transfers) -> List[bool]:
+        """Run (from, to, amount) transfers; same-shard ones locally, the rest by two-phase commit
+
+        All shards receive their share of a phase at once: local transfers and
+        prepares in the first round, commit/abort decisions in the second.
+        """
+        results: List[bool] = []
+        first: Dict[int, List[tuple]] = defaultdict(list)
+        slots: Dict[int, List[Tuple[int, Optional[int]]]] = defaultdict(list)   # (result index, txid)
+        for index, (from_account, to_account, amount) in enumerate(transfers):
+            results.append(False)
+            amount_minor = to_minor(amount)
+            if amount_minor <= 0:
+                continue
+            sender, receiver = self.shard_of(from_account), self.shard_of(to_account)
+            if sender == receiver:
+                first[sender].append(("transfer", from_account, to_account, amount_minor))
+                slots[sender].append((index, None))
+                continue
+            txid = next(self._txids)
+            first[sender].append(("prepare_debit", txid, from_account, amount_minor, to_account))
+            slots[sender].append((index, txid))
+            first[receiver].append(("prepare_credit", txid, to_account, amount_minor, from_account))
+            slots[receiver].append((index, txid))
+
+        votes: Dict[int, List] = {}                         # txid -> [yes votes, shards, result index]
+        for shard, replies in self._round(first).items():
+            for (index, txid), reply in zip(slots[shard], replies):
+                if txid is None:
+                    results[index] = bool(reply)
+                    continue
+                vote = votes.setdefault(txid, [0, [], index])
+                vote[0] += bool(reply)
+                vote[1].append(shard)
+
+        second: Dict[int, List[tuple]] = defaultdict(list)
+        for txid, (yes, shards, index) in votes.items():
+            decision = "commit" if yes == 2 else "abort"
+            results[index] = decision == "commit"
+            for shard in shards:
+                second[shard].append((decision, txid))
+        if second:
+            self._round(second)
+        return results
+
+    # ---------------- LIFECYCLE ----------------
+    def stats(self) -> Dict[int, Dict[str, int]]:
+        """Per-shard account count, balance and fee totals (paise)"""
+        return {shard: replies[0] for shard, replies in
+                self._round({shard: [("totals",)] for shard in range(self.shards)}).items()}
+
+    def close(self, timeout: float = 10.0) -> None:
+        for conn in self._conns:
+            try:
+                conn.send(_STOP)
+            except (OSError, EOFError):                         # shard already gone
+                pass
+            conn.close()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._conns = []
+        self._processes = []
+
+    def __enter__(self) -> "ShardedBank":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,176 @@
+# Event System Benchmarks
+# Micro-benchmarks for the EventEmitter in Event_DrivenArchitecture.py
+# Run: python Event_Benchmarks.py
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+import threading
+import time
+import timeit
+import tracemalloc
+
+from Event_DrivenArchitecture import Event, EventEmitter
+from Event_Multiprocess import ProcessFanout
+
+
+# ---------------- EVENT REPRESENTATION ----------------
+
+@dataclass
+class LegacyEvent:
+    """The original dataclass Event, kept for comparison"""
+    name: str
+    data: Any
+    timestamp: datetime = field(default_factory=datetime.now)
+    source: str = ""
+
+
+def _allocated_bytes(factory, count: int) -> int:
+    """Bytes held by `count` objects built by factory"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return after - before
+
+
+def compare_event_types(count: int = 100_000) -> dict:
+    """Memory per event and construction rate: LegacyEvent vs slotted Event"""
+    names = [f"user.{i % 50}" for i in range(count)]     # Realistic mix of repeated names
+    results = {}
+    for label, cls in (("dataclass", LegacyEvent), ("slotted", Event)):
+        memory = _allocated_bytes(lambda i: cls(names[i], i), count)
+        seconds = timeit.timeit(lambda: cls("user.login", None), number=count)
+        results[label] = {
+            "bytes_per_event": memory / count,
+            "events_per_sec": count / seconds,
+        }
+    return results
+
+
+def emit_throughput(count: int = 100_000, history_limit: int = 1000) -> float:
+    """Emits per second with history on and one exact plus one wildcard listener"""
+    emitter = EventEmitter(keep_history=True, history_limit=history_limit)
+    emitter.on("user.login", lambda event: None)
+    emitter.on("user.*", lambda event: None)
+    seconds = timeit.timeit(lambda: emitter.emit("user.login", 1), number=count)
+    return count / seconds
+
+
+# ---------------- CONCURRENT EMIT ----------------
+
+def concurrency_stress(emitters: int = 8, churners: int = 2, onces: int = 2000, seconds: float = 2.0) -> dict:
+    """Emit from many threads while others subscribe/unsubscribe; checks once fires exactly once"""
+    emitter = EventEmitter(keep_history=True)
+    errors = []
+    once_hits = [0] * onces
+    stop = threading.Event()
+
+    def make_once(slot):
+        def hit(event):
+            once_hits[slot] += 1
+        return hit
+
+    for slot in range(onces):
+        emitter.once("stress.once" if slot % 2 else "stress.*", make_once(slot))
+    emitter.on("stress.*", lambda event: None)
+
+    def emit_loop():
+        try:
+            while not stop.is_set():
+                emitter.emit("stress.once", 1)
+                emitter.emit_many([("stress.tick", 1), ("stress.tock", 2)])
+        except Exception as e:
+            errors.append(e)
+
+    def churn_loop(worker):
+        try:
+            while not stop.is_set():
+                callback = lambda event: None
+                emitter.on(f"stress.churn.{worker}", callback)
+                emitter.on("stress.*", callback)
+                emitter.off("stress.*", callback)
+                emitter.off(f"stress.churn.{worker}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=emit_loop) for _ in range(emitters)]
+    threads += [threading.Thread(target=churn_loop, args=(worker,)) for worker in range(churners)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+    assert all(hits == 1 for hits in once_hits), "once listener fired more or less than once"
+    return {"errors": len(errors), "once_listeners": onces, "history": len(emitter.get_history())}
+
+
+def threaded_emit_throughput(total: int = 200_000, thread_counts=(1, 2, 4, 8)) -> dict:
+    """Total emits/sec on one emitter shared by several threads"""
+    results = {}
+    for threads in thread_counts:
+        emitter = EventEmitter()
+        emitter.on("user.login", lambda event: None)
+        emitter.on("user.*", lambda event: None)
+        per_thread = total // threads
+
+        def run():
+            for _ in range(per_thread):
+                emitter.emit("user.login", 1)
+
+        workers = [threading.Thread(target=run) for _ in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        results[threads] = per_thread * threads / (time.perf_counter() - started)
+    return results
+
+
+# ---------------- CROSS-PROCESS FAN-OUT ----------------
+
+def cpu_heavy_listener(event) -> None:
+    """Stand-in for a CPU-bound subscriber"""
+    total = 0
+    for i in range(event.data):
+        total += i * i
+
+
+def fanout_scaling(events: int = 2000, work: int = 20_000, worker_counts=(1, 2, 4)) -> dict:
+    """Events/sec through ProcessFanout for different worker counts"""
+    results = {}
+    for workers in worker_counts:
+        emitter = EventEmitter()
+        fanout = ProcessFanout(emitter)
+        fanout.on("job.*", cpu_heavy_listener, workers=workers)
+        started = time.perf_counter()
+        for _ in range(events):
+            emitter.emit("job.run", work)
+        stats = fanout.close()
+        elapsed = time.perf_counter() - started
+        processed = sum(entry["processed"] for entry in stats.values())
+        results[workers] = processed / elapsed
+    return results
+
+
+if __name__ == "__main__":
+    print("\n========== EVENT REPRESENTATION ==========")
+    for label, stats in compare_event_types().items():
+        print(f"{label:10} | {stats['bytes_per_event']:7.1f} bytes/event | "
+              f"{stats['events_per_sec']:>12,.0f} events/sec")
+    print(f"\nemit() with history: {emit_throughput():,.0f} emits/sec")
+
+    print("\n========== CONCURRENT EMIT ==========")
+    print("stress:", concurrency_stress())
+    for threads, rate in threaded_emit_throughput().items():
+        print(f"{threads} thread(s) | {rate:>12,.0f} emits/sec")
+
+    print("\n========== CROSS-PROCESS FAN-OUT ==========")
+    for workers, rate in fanout_scaling().items():
+        print(f"{workers} worker(s) | {rate:>10,.0f} events/sec")
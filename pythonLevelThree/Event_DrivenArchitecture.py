@@ -1,173 +1,1468 @@
 # Event-Driven Architecture Implementation
 # Implements a publish/subscribe event system with advanced features
 
-from typing import Callable, Any, List, Dict
-from dataclasses import dataclass, field
+from typing import Callable, Any, List, Dict, Set, Tuple, Iterator, Iterable, Optional, Union, Deque
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import functools
+import itertools
+import json
+import threading
 from datetime import datetime
 import asyncio
+import bisect
 import fnmatch
+import heapq
+import inspect
+import os
+import re
+import sys
+import time
+import weakref
+
+_WILDCARD_CHARS = re.compile(r"[*?\[]")   # Characters that make a pattern a wildcard
+_CLOCK_OFFSET_NS = time.time_ns() - time.monotonic_ns()   # Monotonic ns + offset = epoch ns
+
+
+def to_epoch_ns(when: datetime) -> int:
+    """Wall-clock datetime -> epoch nanoseconds, exact to the microsecond"""
+    return int(when.replace(microsecond=0).timestamp()) * 1_000_000_000 + when.microsecond * 1000
+
+
+def to_monotonic_ns(when: Union[datetime, int]) -> int:
+    """Convert a wall-clock datetime (or epoch ns) to the monotonic ns used by Event"""
+    if isinstance(when, datetime):
+        when = to_epoch_ns(when)
+    return when - _CLOCK_OFFSET_NS
+
 
-@dataclass
 class Event:
-    """Data class representing an event with metadata"""
-    name: str                                           # Event name/type
-    data: Any                                          # Event payload data
-    timestamp: datetime = field(default_factory=datetime.now)  # When event occurred
-    source: str = ""                                   # Source identifier of the event
+    """Event with metadata - slotted, interned name, monotonic ns timestamp
+
+    The datetime `timestamp` is built lazily from timestamp_ns on first access,
+    so emitting only pays for one time.monotonic_ns() call.
+    """
+
+    __slots__ = ("name", "data", "source", "timestamp_ns", "_timestamp")
+
+    def __init__(self, name: str, data: Any = None, timestamp: datetime = None,
+                 source: str = "", timestamp_ns: int = None):
+        self.name = sys.intern(name)                        # Event name/type, interned
+        self.data = data                                    # Event payload data
+        self.source = source                                # Source identifier of the event
+        self._timestamp = timestamp                         # Cached datetime, built on demand
+        if timestamp_ns is None:
+            timestamp_ns = to_monotonic_ns(timestamp) if timestamp is not None else time.monotonic_ns()
+        self.timestamp_ns = timestamp_ns                    # When event occurred (monotonic ns)
+
+    @property
+    def timestamp(self) -> datetime:
+        """When event occurred as a local datetime, truncated to the microsecond"""
+        if self._timestamp is None:
+            stamp = self.epoch_ns
+            self._timestamp = datetime.fromtimestamp(stamp // 1_000_000_000).replace(
+                microsecond=stamp // 1000 % 1_000_000)
+        return self._timestamp
+
+    @property
+    def epoch_ns(self) -> int:
+        """When event occurred in nanoseconds since the Unix epoch"""
+        return self.timestamp_ns + _CLOCK_OFFSET_NS
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Event):
+            return NotImplemented
+        return (self.name, self.data, self.timestamp_ns, self.source) == \
+               (other.name, other.data, other.timestamp_ns, other.source)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"Event(name={self.name!r}, data={self.data!r}, "
+                f"timestamp={self.timestamp!r}, source={self.source!r})")
+
+class _Listener:
+    """Registered callback plus its delivery options"""
+
+    __slots__ = ("callback", "batch", "rate", "active", "target", "priority", "seq", "_claims")
+
+    def __init__(self, callback: Callable, batch: bool = False, rate: "_RateControl" = None,
+                 target: weakref.ref = None, priority: int = 0):
+        self.callback = callback                             # User callback (or weak trampoline)
+        self.batch = batch                                   # Receives a list of events per emit
+        self.rate = rate                                     # Debounce/throttle/coalesce, or None
+        self.priority = priority                             # Higher runs first
+        self.seq = 0                                         # Registration order, set by the emitter
+        self.active = True                                   # Cleared on unsubscribe, skipped by emit
+        self.target = target                                 # Weak reference for weak listeners
+        self._claims = itertools.count()                     # next() is atomic under the GIL
+
+    def order(self) -> Tuple[int, int]:
+        """Sort key: priority descending, then registration order"""
+        return -self.priority, self.seq
+
+    def registered_with(self, callback: Callable) -> bool:
+        """True if this listener was registered for callback"""
+        if self.target is not None:
+            return self.target() == callback
+        return self.callback == callback
+
+    def claim(self) -> bool:
+        """True for exactly one caller - lets a once listener fire a single time across threads"""
+        return next(self._claims) == 0
+
+
+class Subscription:
+    """Handle returned by on()/once(); unsubscribe() is O(1) amortized"""
+
+    __slots__ = ("_emitter", "_once", "event_name", "_listener", "__weakref__")
+
+    def __init__(self, emitter: "EventEmitter", once: bool, event_name: str, listener: _Listener):
+        self._emitter = emitter
+        self._once = once
+        self.event_name = event_name
+        self._listener = listener
+
+    @property
+    def active(self) -> bool:
+        return self._listener.active
+
+    def unsubscribe(self) -> bool:
+        """Detach the listener, returns False if it was already detached"""
+        return self._emitter._unsubscribe(self._once, self.event_name, self._listener)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.unsubscribe()
+
+
+_DEAD = object()                                             # Returned by a weak trampoline whose target is gone
+
+
+def _weak_callback(callback: Callable, on_dead: Callable) -> Tuple[Callable, weakref.ref]:
+    """Trampoline holding callback weakly; calls on_dead() and returns _DEAD once the target is collected"""
+    target = weakref.WeakMethod(callback) if inspect.ismethod(callback) else weakref.ref(callback)
+
+    if asyncio.iscoroutinefunction(callback):
+        async def call(argument):
+            resolved = target()
+            if resolved is None:
+                on_dead()
+                return _DEAD
+            return await resolved(argument)
+    else:
+        def call(argument):
+            resolved = target()
+            if resolved is None:
+                on_dead()
+                return _DEAD
+            return resolved(argument)
+
+    return call, target
+
+
+class _TimerWheel:
+    """Hashed timing wheel on one daemon thread, shared by every rate-controlled listener"""
+
+    def __init__(self, tick: float = 0.005, slots: int = 512):
+        self.tick = tick                                     # Seconds per wheel slot
+        self._slots: List[List[list]] = [[] for _ in range(slots)]
+        self._lock = threading.Lock()
+        self._now = 0                                        # Ticks elapsed since start
+        self._started = None                                 # perf_counter() at tick 0
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, delay: float, callback: Callable) -> list:
+        """Run callback after delay seconds on the wheel thread, returns a cancellable entry"""
+        with self._lock:
+            if self._thread is None:
+                self._started = time.perf_counter()
+                self._thread = threading.Thread(target=self._run, name="event-timer-wheel", daemon=True)
+                self._thread.start()
+            due = self._now + max(1, -(-delay // self.tick))  # Round up to whole ticks
+            entry = [int(due), callback, False]               # [due tick, callback, cancelled]
+            self._slots[entry[0] % len(self._slots)].append(entry)
+        return entry
+
+    @staticmethod
+    def cancel(entry: list) -> None:
+        entry[2] = True
+
+    def _run(self) -> None:
+        while True:
+            wake_at = self._started + (self._now + 1) * self.tick
+            delay = wake_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with self._lock:
+                self._now += 1
+                slot = self._slots[self._now % len(self._slots)]
+                due = [entry for entry in slot if entry[0] <= self._now]
+                slot[:] = [entry for entry in slot if entry[0] > self._now]
+            for _, callback, cancelled in due:
+                if not cancelled:
+                    try:
+                        callback()
+                    except Exception as e:
+                        print(f"Error in timer callback: {e!r}", file=sys.stderr)
+
+
+_timer_wheel = _TimerWheel()
+
+
+class _RateControl:
+    """Debounce, throttle or coalesce-by-key for one listener
+
+    offer() returns the (callback, argument) calls to run right away; deferred
+    deliveries run from the timer wheel, directly for sync emits or back on the
+    emitting event loop (through the emitter's dispatcher) for async emits.
+    """
+
+    def __init__(self, emitter: "EventEmitter", callback: Callable, debounce: float = None,
+                 throttle: Tuple[int, float] = None, coalesce: Callable = None,
+                 coalesce_interval: float = 0.1):
+        self.emitter = emitter
+        self.callback = callback
+        self.debounce = debounce                             # Quiet period before delivering the latest event
+        self.throttle = throttle                             # (max calls, per interval seconds)
+        self.coalesce = coalesce                             # Key function, latest event per key is kept
+        self.coalesce_interval = coalesce_interval           # Seconds between coalesced flushes
+        self.dropped = 0                                     # Events suppressed by the operator
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[list] = None
+        self._latest: Any = None                             # Debounce: newest pending event
+        self._pending: Dict[Any, Any] = {}                   # Coalesce: key -> newest event
+        self._window_start = 0.0                             # Throttle: current window
+        self._window_calls = 0
+
+    def offer(self, argument: Any, loop: Optional[asyncio.AbstractEventLoop]) -> List[Tuple[Callable, Any]]:
+        with self._lock:
+            self._loop = loop
+            if self.throttle is not None:
+                max_calls, interval = self.throttle
+                now = time.monotonic()
+                if now - self._window_start >= interval:
+                    self._window_start, self._window_calls = now, 0
+                if self._window_calls < max_calls:
+                    self._window_calls += 1
+                    return [(self.callback, argument)]
+                self.dropped += 1
+                return []
+
+            if self.debounce is not None:
+                if self._timer is not None:
+                    _timer_wheel.cancel(self._timer)
+                    self.dropped += 1
+                self._latest = argument
+                self._timer = _timer_wheel.schedule(self.debounce, self._flush)
+                return []
+
+            key = self.coalesce(argument)
+            if key in self._pending:
+                self.dropped += 1
+            self._pending[key] = argument
+            if self._timer is None:
+                self._timer = _timer_wheel.schedule(self.coalesce_interval, self._flush)
+            return []
+
+    def _flush(self) -> None:
+        """Timer wheel callback: deliver the debounced or coalesced events"""
+        with self._lock:
+            self._timer = None
+            if self.debounce is not None:
+                ready, self._latest = [self._latest], None
+            else:
+                ready, self._pending = list(self._pending.values()), {}
+            loop = self._loop
+        calls = [(self.callback, argument) for argument in ready]
+        metrics = self.emitter._metrics
+        if loop is not None and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.emitter._dispatch_all(calls), loop)
+            if metrics is not None:
+                self._count(metrics, ready)
+            return
+        delivered = []
+        for callback, argument in calls:
+            try:
+                result = callback(argument) if metrics is None else metrics.call(callback, argument)
+            except Exception as e:
+                _print_listener_error(e, argument, callback)
+                result = None
+            if result is not _DEAD:
+                delivered.append(argument)
+        if metrics is not None:
+            self._count(metrics, delivered)
+
+    @staticmethod
+    def _count(metrics: "EmitterMetrics", delivered: List[Any]) -> None:
+        """Listener calls made by a flush, added to the counts of the emits that deferred them"""
+        invoked: Dict[str, int] = {}
+        for argument in delivered:
+            name = _event_name_of(argument)
+            invoked[name] = invoked.get(name, 0) + 1
+        for name, count in invoked.items():
+            metrics.emitted(name, count, count=0)
+
+
+class _PatternIndex:
+    """Dispatch index: exact names in a hash set, wildcard patterns as compiled matchers
+
+    Writers (serialized by the owner) replace the wildcard tuple instead of
+    mutating it, so match() can run concurrently without locking.
+    """
+
+    def __init__(self):
+        self._order: Dict[str, int] = {}                     # Pattern -> registration order
+        self._exact: Set[str] = set()                        # Patterns without wildcards
+        self._wildcards: Tuple[Tuple[str, Callable], ...] = ()  # (wildcard pattern, compiled match)
+        self._counter = 0
+
+    def __contains__(self, pattern: str) -> bool:
+        return pattern in self._order
+
+    def add(self, pattern: str) -> bool:
+        """Index a pattern, returns True if it was not indexed before"""
+        if pattern in self._order:
+            return False
+        self._order[pattern] = self._counter
+        self._counter += 1
+        if _WILDCARD_CHARS.search(pattern):
+            # Same semantics as fnmatch.fnmatchcase, compiled once per pattern
+            self._wildcards = self._wildcards + ((pattern, re.compile(fnmatch.translate(pattern)).match),)
+        else:
+            self._exact.add(pattern)
+        return True
+
+    def discard(self, pattern: str) -> bool:
+        """Drop a pattern from the index, returns True if it was indexed"""
+        if self._order.pop(pattern, None) is None:
+            return False
+        self._exact.discard(pattern)
+        self._wildcards = tuple(entry for entry in self._wildcards if entry[0] != pattern)
+        return True
+
+    def match(self, event_name: str) -> List[str]:
+        """Return all patterns matching event_name in registration order"""
+        matched = [pattern for pattern, matcher in self._wildcards if matcher(event_name)]
+        if event_name in self._exact:
+            matched.append(event_name)
+            if len(matched) > 1:
+                matched.sort(key=lambda pattern: self._order.get(pattern, -1))
+        return matched
+
+
+class _NameIndex:
+    """Ascending sequence numbers of retained events sharing one name"""
+
+    __slots__ = ("seqs", "head")
+
+    def __init__(self):
+        self.seqs: List[int] = []                            # Sequence numbers, oldest first
+        self.head = 0                                        # Index of first live entry in seqs
+
+    def __len__(self) -> int:
+        return len(self.seqs) - self.head
+
+    def append(self, seq: int) -> None:
+        self.seqs.append(seq)
+
+    def popleft(self) -> None:
+        """Drop the oldest entry in O(1) amortized, compacting once half the list is dead"""
+        self.head += 1
+        if self.head > 32 and self.head * 2 > len(self.seqs):
+            del self.seqs[:self.head]
+            self.head = 0
+
+    def between(self, lo: int, hi: int, limit: Optional[int] = None) -> List[int]:
+        """Sequence numbers in [lo, hi), keeping only the newest `limit` of them"""
+        start = bisect.bisect_left(self.seqs, lo, self.head)
+        stop = bisect.bisect_left(self.seqs, hi, start)
+        if limit is not None:
+            start = max(start, stop - limit)
+        return self.seqs[start:stop]
+
+
+class _HistoryBuffer:
+    """Fixed-capacity ring buffer of events with per-name and time-range indexes
+
+    Events are stamped before they reach the history lock, so concurrent emitters
+    can store them slightly out of timestamp order. Time lookups therefore bisect
+    a running maximum of the stamps (never decreasing) and widen the upper bound
+    by the largest amount any retained stamp fell behind that maximum, then filter
+    exactly. Prebuilt Events passed to emit_many keep their own, possibly much
+    older, timestamps; such an event only widens lookups until it is evicted.
+    """
+
+    def __init__(self, capacity: int):
+        self._capacity = max(capacity, 0)                    # Max events retained
+        self._slots: List[Optional[Event]] = [None] * self._capacity
+        self._peaks: List[int] = [0] * self._capacity        # Running max of timestamp_ns per slot
+        self._lags: Deque[Tuple[int, int]] = deque()         # (seq, peak - timestamp_ns), lags decreasing
+        self._start = 0                                      # Sequence number of oldest event
+        self._end = 0                                        # Sequence number of next event
+        self._by_name: Dict[str, _NameIndex] = {}            # Event name -> retained sequence numbers
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __iter__(self) -> Iterator[Event]:
+        return (self._slots[seq % self._capacity] for seq in range(self._start, self._end))
+
+    def append(self, event: Event) -> None:
+        """Store an event in O(1), evicting the oldest one when full"""
+        if not self._capacity:
+            return
+        if self._end - self._start == self._capacity:
+            oldest = self._slots[self._start % self._capacity]
+            index = self._by_name[oldest.name]
+            index.popleft()
+            if not len(index):
+                del self._by_name[oldest.name]
+            if self._lags and self._lags[0][0] == self._start:
+                self._lags.popleft()
+            self._start += 1
+        stamp = event.timestamp_ns
+        peak = stamp
+        if self._end > self._start:
+            peak = max(stamp, self._peaks[(self._end - 1) % self._capacity])
+            if peak > stamp:
+                # Sliding-window maximum: a smaller, older lag can never be the max again
+                lags = self._lags
+                while lags and lags[-1][1] <= peak - stamp:
+                    lags.pop()
+                lags.append((self._end, peak - stamp))
+        self._slots[self._end % self._capacity] = event
+        self._peaks[self._end % self._capacity] = peak
+        index = self._by_name.get(event.name)
+        if index is None:
+            index = self._by_name[event.name] = _NameIndex()
+        index.append(self._end)
+        self._end += 1
+
+    def extend(self, events: Iterable[Event]) -> None:
+        """Store a batch of events in arrival order"""
+        append = self.append
+        for event in events:
+            append(event)
+
+    def _bisect_time(self, when: int, inclusive: bool) -> int:
+        """First sequence number whose running-max stamp is >= when (> when if inclusive)"""
+        lo, hi = self._start, self._end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            stamp = self._peaks[mid % self._capacity]
+            if stamp < when or (inclusive and stamp == when):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def select(self, event_pattern: str = "*", limit: int = None,
+               since: datetime = None, until: datetime = None) -> List[Event]:
+        """Events matching pattern within [since, until], oldest first, newest `limit` kept"""
+        if limit is not None and limit <= 0:
+            return []
+        since_ns = to_monotonic_ns(since) if since is not None else None
+        # Event.timestamp is truncated to the microsecond, so `until` covers its whole microsecond
+        until_ns = to_monotonic_ns(until) + 999 if until is not None else None
+        lo = self._bisect_time(since_ns, inclusive=False) if since is not None else self._start
+        lag = self._lags[0][1] if self._lags else 0
+        hi = self._bisect_time(until_ns + lag, inclusive=True) if until is not None else self._end
+        if lo >= hi:
+            return []
+        exact = lag and (since is not None or until is not None)
+        if exact:
+            # Stamps in [lo, hi) may be out of order: check each one, then apply the limit
+            limit, keep = None, limit
+
+        if event_pattern == "*":
+            # Every event matches, slice the ring directly
+            if limit is not None:
+                lo = max(lo, hi - limit)
+            seqs = range(lo, hi)
+        elif not _WILDCARD_CHARS.search(event_pattern):
+            # Exact name, read straight from its index
+            index = self._by_name.get(event_pattern)
+            seqs = index.between(lo, hi, limit) if index is not None else []
+        else:
+            # Wildcard, merge the indexes of every matching name
+            matcher = re.compile(fnmatch.translate(event_pattern)).match
+            runs = [index.between(lo, hi, limit) for name, index in self._by_name.items() if matcher(name)]
+            seqs = list(heapq.merge(*runs))
+            if limit is not None:
+                seqs = seqs[-limit:]
+
+        events = [self._slots[seq % self._capacity] for seq in seqs]
+        if exact:
+            events = [event for event in events
+                      if (since_ns is None or event.timestamp_ns >= since_ns)
+                      and (until_ns is None or event.timestamp_ns <= until_ns)]
+            if keep is not None:
+                events = events[-keep:]
+        return events
+
+
+class DispatchOverflow(RuntimeError):
+    """Raised for listener calls dropped or rejected by a full dispatcher queue"""
+
+
+def _print_listener_error(error: BaseException, event: Any, callback: Callable) -> None:
+    """Default error callback - report failing listeners on stderr"""
+    name = getattr(callback, "__qualname__", repr(callback))
+    print(f"Error in listener {name} for {getattr(event, 'name', event)!r}: {error!r}", file=sys.stderr)
+
+
+class AsyncDispatcher:
+    """Runs sync listeners for emit_async on a persistent thread pool with backpressure
+
+    At most max_concurrency calls run at once; the rest wait in a pending queue
+    of max_pending entries. When that queue is full the overflow policy decides:
+    "block" waits for space, "drop_oldest" discards the oldest pending call and
+    "reject" refuses the new one. Listener failures, drops and rejections are
+    all passed to on_error(error, event, callback).
+    """
+
+    OVERFLOW_POLICIES = ("block", "drop_oldest", "reject")
+
+    def __init__(self, max_workers: int = 4, max_concurrency: int = None, max_pending: int = 1000,
+                 overflow: str = "block", on_error: Callable = None,
+                 executor: ThreadPoolExecutor = None):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {self.OVERFLOW_POLICIES}")
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers,
+                                                        thread_name_prefix="event-listener")
+        self.max_concurrency = max_concurrency or max_workers   # Calls running at once
+        self.max_pending = max_pending                          # Calls allowed to wait
+        self.overflow = overflow                                # Policy when the queue is full
+        self.on_error = on_error or _print_listener_error       # Error callback
+        self._pending: Deque[Tuple[Callable, Any, asyncio.Future]] = deque()
+        self._space_waiters: Deque[asyncio.Future] = deque()    # Submitters blocked on a full queue
+        self._running = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of calls waiting for a free slot"""
+        return len(self._pending)
+
+    @property
+    def running(self) -> int:
+        """Number of calls currently executing"""
+        return self._running
+
+    def report(self, error: BaseException, event: Any, callback: Callable) -> None:
+        """Pass a failure to the error callback without letting it escape"""
+        try:
+            self.on_error(error, event, callback)
+        except Exception:
+            pass
+
+    async def submit(self, callback: Callable, argument: Any) -> asyncio.Future:
+        """Queue a sync callback call, returns a future resolved when it finishes"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        while len(self._pending) >= self.max_pending:
+            if self.overflow == "reject":
+                error = DispatchOverflow("dispatcher queue is full, call rejected")
+                self.report(error, argument, callback)
+                future.set_exception(error)
+                return future
+            if self.overflow == "drop_oldest":
+                dropped_callback, dropped_argument, dropped = self._pending.popleft()
+                error = DispatchOverflow("dispatcher queue is full, oldest call dropped")
+                self.report(error, dropped_argument, dropped_callback)
+                if not dropped.done():
+                    dropped.set_exception(error)
+                continue
+            waiter = loop.create_future()
+            self._space_waiters.append(waiter)
+            await waiter
+
+        self._pending.append((callback, argument, future))
+        self._pump(loop)
+        return future
+
+    def _pump(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start pending calls while there are free slots"""
+        while self._pending and self._running < self.max_concurrency:
+            callback, argument, future = self._pending.popleft()
+            if future.done():
+                continue
+            self._running += 1
+            job = loop.run_in_executor(self._executor, callback, argument)
+            job.add_done_callback(lambda job, c=callback, a=argument, f=future: self._finished(loop, c, a, f, job))
+        # Wake blocked submitters for every slot freed in the queue
+        free = self.max_pending - len(self._pending)
+        while self._space_waiters and free > 0:
+            waiter = self._space_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def _finished(self, loop: asyncio.AbstractEventLoop, callback: Callable, argument: Any,
+                  future: asyncio.Future, job: asyncio.Future) -> None:
+        self._running -= 1
+        error = job.exception() if not job.cancelled() else asyncio.CancelledError()
+        if error is not None:
+            self.report(error, argument, callback)
+        if not future.done():
+            if error is None:
+                future.set_result(job.result())
+            else:
+                future.set_exception(error)
+        self._pump(loop)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the thread pool if this dispatcher created it"""
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait)
+
+
+class _LatencyHistogram:
+    """Power-of-two microsecond buckets plus count, total and max"""
+
+    BUCKETS = 24                                             # Last bucket holds everything >= 2^22 us
+
+    __slots__ = ("counts", "total", "max", "calls")
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0.0                                     # Seconds spent in the listener
+        self.max = 0.0
+        self.calls = 0
+
+    def add(self, seconds: float) -> None:
+        micros = int(seconds * 1_000_000)
+        self.counts[min(micros.bit_length(), self.BUCKETS - 1)] += 1
+        self.total += seconds
+        self.calls += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> dict:
+        buckets = {f"<{1 << i}us": n for i, n in enumerate(self.counts[:-1]) if n}
+        if self.counts[-1]:
+            buckets[f">={1 << (self.BUCKETS - 2)}us"] = self.counts[-1]
+        return {
+            "calls": self.calls,
+            "mean_ms": self.total / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max * 1000,
+            "buckets": buckets,
+        }
+
+
+class EmitterMetrics:
+    """Emit counts, per-listener latency histograms, async queue depth and slow listeners"""
+
+    def __init__(self, slow_threshold: float = 0.1, on_slow: Callable = None):
+        self.slow_threshold = slow_threshold                 # Seconds before a call counts as slow
+        self.on_slow = on_slow                               # on_slow(listener, event_name, seconds)
+        self.emits: Dict[str, int] = {}                      # Event name -> emits
+        self.listener_calls: Dict[str, int] = {}             # Event name -> listeners invoked
+        self.latency: Dict[Tuple[str, str], _LatencyHistogram] = {}  # (listener, "sync"/"async") -> histogram
+        self.slow: Dict[str, int] = {}                       # Listener -> slow call count
+        self.queue_pending = 0                               # Last observed dispatcher backlog
+        self.queue_running = 0
+        self.queue_max_pending = 0
+        self._lock = threading.Lock()                        # Worker threads report concurrently
+        self._dump_stop: Optional[threading.Event] = None
+
+    @staticmethod
+    def listener_name(callback: Callable) -> str:
+        module = getattr(callback, "__module__", None)
+        name = getattr(callback, "__qualname__", None) or repr(callback)
+        return f"{module}.{name}" if module else name
+
+    def emitted(self, event_name: str, listeners_called: int, count: int = 1) -> None:
+        with self._lock:
+            self.emits[event_name] = self.emits.get(event_name, 0) + count
+            self.listener_calls[event_name] = self.listener_calls.get(event_name, 0) + listeners_called
+
+    def observe(self, callback: Callable, mode: str, event_name: str, seconds: float) -> None:
+        """Record one listener call"""
+        name = self.listener_name(callback)
+        with self._lock:
+            histogram = self.latency.get((name, mode))
+            if histogram is None:
+                histogram = self.latency[(name, mode)] = _LatencyHistogram()
+            histogram.add(seconds)
+            slow = seconds >= self.slow_threshold
+            if slow:
+                self.slow[name] = self.slow.get(name, 0) + 1
+        if slow and self.on_slow is not None:
+            self.on_slow(name, event_name, seconds)
+
+    def observe_queue(self, pending: int, running: int) -> None:
+        self.queue_pending = pending
+        self.queue_running = running
+        if pending > self.queue_max_pending:
+            self.queue_max_pending = pending
+
+    def call(self, callback: Callable, argument: Any) -> Any:
+        """Run a sync listener and time it"""
+        started = time.perf_counter()
+        try:
+            return callback(argument)
+        finally:
+            self.observe(callback, "sync", _event_name_of(argument), time.perf_counter() - started)
+
+    def timed(self, callback: Callable) -> Callable:
+        """Wrap a sync listener so calls on worker threads are timed"""
+        @functools.wraps(callback)
+        def run(argument):
+            return self.call(callback, argument)
+        return run
+
+    async def call_async(self, callback: Callable, argument: Any) -> Any:
+        """Await a coroutine listener and time it"""
+        started = time.perf_counter()
+        try:
+            return await callback(argument)
+        finally:
+            self.observe(callback, "async", _event_name_of(argument), time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        """Copy of all metrics as plain data"""
+        with self._lock:
+            return {
+                "emits": dict(self.emits),
+                "listener_calls": dict(self.listener_calls),
+                "latency": {f"{name} [{mode}]": histogram.as_dict()
+                            for (name, mode), histogram in self.latency.items()},
+                "slow_listeners": dict(self.slow),
+                "slow_threshold_ms": self.slow_threshold * 1000,
+                "queue": {"pending": self.queue_pending, "running": self.queue_running,
+                          "max_pending": self.queue_max_pending},
+            }
+
+    def dump(self, path: str) -> None:
+        """Write a snapshot to a JSON file, replacing it atomically"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as fh:
+            json.dump(self.snapshot(), fh, indent=2)
+        os.replace(temp_path, path)
+
+    def start_dump(self, path: str, interval: float = 10.0) -> None:
+        """Dump a snapshot to path every interval seconds on a daemon thread"""
+        self.stop_dump()
+        stop = self._dump_stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                self.dump(path)
+            self.dump(path)
+
+        threading.Thread(target=loop, name="emitter-metrics-dump", daemon=True).start()
+
+    def stop_dump(self) -> None:
+        if self._dump_stop is not None:
+            self._dump_stop.set()
+            self._dump_stop = None
+
+
+def _event_name_of(argument: Any) -> str:
+    """Event name for a listener argument (an event or a batch of events)"""
+    if isinstance(argument, Event):
+        return argument.name
+    return argument[0].name if argument else ""
+
+
+class StreamOverflow(RuntimeError):
+    """Raised when a blocking stream is full and the producer runs on the consumer's loop thread"""
+
+
+class EventStream:
+    """Async iterator over events matching a pattern, backed by a bounded queue
+
+    Producers never wait on a slow consumer unless asked to: with "drop_oldest"
+    or "drop_newest" a full queue discards events (counted in `dropped`). With
+    "block" the emitting thread waits for space; emits made on the consumer's
+    own event loop thread cannot wait and raise StreamOverflow instead, so
+    blocking streams are meant to be fed from other threads or emit_async.
+    """
+
+    OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self, emitter: "EventEmitter", event_pattern: str, maxsize: int, overflow_policy: str):
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {self.OVERFLOW_POLICIES}")
+        self.event_pattern = event_pattern
+        self.maxsize = max(maxsize, 1)                       # Events buffered before overflow
+        self.overflow_policy = overflow_policy
+        self.dropped = 0                                     # Events discarded on overflow
+        self._buffer: Deque[Event] = deque()
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)        # Signalled when the consumer takes events
+        self._waiter: Optional[asyncio.Future] = None        # Consumer waiting for an event
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._closed = False
+        try:
+            self._bind(asyncio.get_running_loop())
+        except RuntimeError:
+            pass                                             # Bound on first __anext__
+        # Weak, so a stream dropped without close() is collected and unsubscribes itself
+        self._subscription = emitter.on(event_pattern, self._push, batch=True, weak=True)
+
+    def _bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def _push(self, events: List[Event]) -> None:
+        """Batch listener: enqueue events according to the overflow policy"""
+        with self._lock:
+            for event in events:
+                while len(self._buffer) >= self.maxsize and not self._closed:
+                    if self.overflow_policy == "drop_oldest":
+                        self._buffer.popleft()
+                        self.dropped += 1
+                    elif self.overflow_policy == "drop_newest":
+                        break
+                    elif threading.get_ident() == self._loop_thread:
+                        raise StreamOverflow(f"stream {self.event_pattern!r} is full")
+                    else:
+                        self._space.wait()
+                if self._closed:
+                    return
+                if len(self._buffer) >= self.maxsize:
+                    self.dropped += 1                        # drop_newest
+                    continue
+                self._buffer.append(event)
+            self._wake()
+
+    def _wake(self) -> None:
+        """Resolve the consumer's waiter from whichever thread produced the event"""
+        waiter = self._waiter
+        if waiter is None:
+            return
+        self._waiter = None
+        if threading.get_ident() == self._loop_thread:
+            if not waiter.done():
+                waiter.set_result(None)
+        else:
+            self._loop.call_soon_threadsafe(lambda: waiter.done() or waiter.set_result(None))
+
+    def _take(self, limit: int) -> List[Event]:
+        """Pop up to limit buffered events without waiting"""
+        with self._lock:
+            taken = [self._buffer.popleft() for _ in range(min(limit, len(self._buffer)))]
+            if taken:
+                self._space.notify_all()
+            return taken
+
+    async def _wait(self, timeout: float = None) -> bool:
+        """Wait until events are buffered, returns False on timeout or when closed and empty"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._bind(loop)
+        with self._lock:
+            if self._buffer:
+                return True
+            if self._closed:
+                return False
+            waiter = self._waiter = loop.create_future()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return False
+        return bool(self._buffer) or not self._closed
+
+    def __aiter__(self) -> "EventStream":
+        return self
+
+    async def __anext__(self) -> Event:
+        while True:
+            taken = self._take(1)
+            if taken:
+                return taken[0]
+            if self._closed or not await self._wait():
+                if self._closed and not self._buffer:
+                    raise StopAsyncIteration
+
+    async def batch(self, n: int, timeout: float = None):
+        """Async generator of event lists: up to n events, or fewer once timeout passes"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                chunk = [await self.__anext__()]
+            except StopAsyncIteration:
+                return
+            deadline = None if timeout is None else loop.time() + timeout
+            while len(chunk) < n:
+                chunk.extend(self._take(n - len(chunk)))
+                if len(chunk) >= n:
+                    break
+                remaining = None if deadline is None else deadline - loop.time()
+                if (remaining is not None and remaining <= 0) or not await self._wait(remaining):
+                    chunk.extend(self._take(n - len(chunk)))
+                    break
+            yield chunk
+
+    def close(self) -> None:
+        """Unsubscribe; buffered events can still be drained"""
+        self._subscription.unsubscribe()
+        with self._lock:
+            self._closed = True
+            self._space.notify_all()
+            self._wake()
+
+    async def __aenter__(self) -> "EventStream":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
 
 class EventEmitter:
     """Main event emitter class implementing pub/sub pattern"""
+
+    DISPATCH_CACHE_LIMIT = 4096                              # Max event names with cached dispatch
     
-    def __init__(self, keep_history: bool = False, history_limit: int = 1000):
-        """Initialize event emitter with optional history tracking"""
-        self._listeners: Dict[str, List[Callable]] = {}      # Regular event listeners
-        self._once_listeners: Dict[str, List[Callable]] = {} # One-time event listeners
-        self._history: List[Event] = []                      # Event history storage
+    def __init__(self, keep_history: bool = False, history_limit: int = 1000,
+                 dispatcher: AsyncDispatcher = None, event_log: Any = None,
+                 partition_by: Callable[[Event], Any] = None):
+        """Initialize event emitter with optional history tracking, async dispatcher and durable log
+
+        event_log is any object with append/extend/replay, such as Event_Log.EventLog;
+        every emitted event is written to it so replay works across restarts.
+        partition_by maps an event to a key; emit_async and emit_many_async deliver
+        events sharing a key one after another, in emit order, while different keys
+        run in parallel.
+        """
+        self._listeners: Dict[str, Tuple[_Listener, ...]] = {}       # Regular event listeners
+        self._once_listeners: Dict[str, Tuple[_Listener, ...]] = {}  # One-time event listeners
+        self._write_lock = threading.Lock()                  # Serializes on/once/off, never taken by emit
+        self._history_lock = threading.Lock()                # Guards the history ring buffer
+        self._dead: Dict[Tuple[bool, str], int] = {}         # (once, pattern) -> unsubscribed, not yet compacted
+        self._seq = itertools.count()                        # Listener registration counter
+        self._prioritized = False                            # Any listener registered with a priority
+        self._partition_by = partition_by                    # Event -> ordering key for emit_async
+        self._partitions: Dict[Any, asyncio.Future] = {}     # Key -> turn of its latest delivery, while in use
+        self._history = _HistoryBuffer(history_limit)        # Event history storage
         self._keep_history = keep_history                    # Whether to track history
         self._history_limit = history_limit                  # Max events to keep in history
+        self._index = _PatternIndex()                        # Index of regular listener patterns
+        self._once_index = _PatternIndex()                   # Index of once listener patterns
+        self._untracked = _PatternIndex()                    # Patterns excluded from history capture
+        self._dispatch_cache: Dict[str, Tuple[List[str], List[str], bool]] = {}  # Event name -> dispatch plan
+        self._dispatcher = dispatcher                        # Created on first async emit if not given
+        self._event_log = event_log                          # Optional persistent history backend
+        self._metrics: Optional[EmitterMetrics] = None       # Instrumentation, None when disabled
+
+    @property
+    def metrics(self) -> Optional[EmitterMetrics]:
+        """Active metrics collector, or None when instrumentation is off"""
+        return self._metrics
+
+    def enable_metrics(self, slow_threshold: float = 0.1, on_slow: Callable = None,
+                       dump_path: str = None, dump_interval: float = 10.0) -> EmitterMetrics:
+        """Start collecting metrics, optionally dumping snapshots to dump_path periodically"""
+        self._metrics = EmitterMetrics(slow_threshold, on_slow)
+        if dump_path is not None:
+            self._metrics.start_dump(dump_path, dump_interval)
+        return self._metrics
+
+    def disable_metrics(self) -> None:
+        """Stop collecting metrics (and any periodic dump)"""
+        if self._metrics is not None:
+            self._metrics.stop_dump()
+        self._metrics = None
 
-    def on(self, event_name: str, callback: Callable) -> None:
-        """Subscribe to an event - callback will be called every time event is emitted"""
-        if event_name not in self._listeners:
-            self._listeners[event_name] = []
-        self._listeners[event_name].append(callback)
+    @property
+    def dispatcher(self) -> AsyncDispatcher:
+        """Dispatcher running sync listeners for the async emit methods"""
+        if self._dispatcher is None:
+            self._dispatcher = AsyncDispatcher()
+        return self._dispatcher
 
-    def once(self, event_name: str, callback: Callable) -> None:
+    def close(self) -> None:
+        """Release the async dispatcher's worker threads"""
+        if self._dispatcher is not None:
+            self._dispatcher.shutdown()
+        if self._event_log is not None:
+            self._event_log.close()
+        self.disable_metrics()
+
+    def _invalidate(self) -> None:
+        """Drop resolved dispatch lists after the set of patterns changed
+
+        The cache is swapped rather than cleared: an emit resolving against the
+        old indexes stores its result in the old dict, which nobody reads again.
+        """
+        self._dispatch_cache = {}
+
+    def _resolve(self, event_name: str) -> Tuple[List[str], List[str], bool]:
+        """Return (regular patterns, once patterns, record in history) for event_name, cached per name"""
+        cache = self._dispatch_cache
+        resolved = cache.get(event_name)
+        if resolved is None:
+            if len(cache) >= self.DISPATCH_CACHE_LIMIT:
+                cache = self._dispatch_cache = {}
+            resolved = (self._index.match(event_name), self._once_index.match(event_name),
+                        not self._untracked.match(event_name))
+            cache[event_name] = resolved
+        return resolved
+
+    def exclude_from_history(self, event_pattern: str) -> None:
+        """Stop recording events matching pattern in history and the event log"""
+        with self._write_lock:
+            if self._untracked.add(event_pattern):
+                self._invalidate()
+
+    def include_in_history(self, event_pattern: str) -> None:
+        """Undo exclude_from_history for a pattern"""
+        with self._write_lock:
+            if self._untracked.discard(event_pattern):
+                self._invalidate()
+
+    def _record(self, event: Event) -> None:
+        """Store an emitted event in history and the durable log"""
+        with self._history_lock:
+            if self._keep_history:
+                self._history.append(event)                  # Ring buffer evicts the oldest event
+            if self._event_log is not None:
+                self._event_log.append(event)
+
+    def _record_batch(self, batch: List[Event]) -> None:
+        """Store the recordable part of a batch in bulk"""
+        if not self._keep_history and self._event_log is None:
+            return
+        recorded = [event for event in batch if self._resolve(event.name)[2]]
+        with self._history_lock:
+            if self._keep_history:
+                self._history.extend(recorded)
+            if self._event_log is not None:
+                self._event_log.extend(recorded)
+
+    def on(self, event_name: str, callback: Callable, batch: bool = False,
+           debounce: float = None, throttle: Tuple[int, float] = None,
+           coalesce: Callable = None, coalesce_interval: float = 0.1,
+           weak: bool = False, priority: int = 0) -> Subscription:
+        """Subscribe to an event - callback will be called every time event is emitted
+
+        With batch=True the callback receives a list of events: the whole matching
+        part of an emit_many batch, or a one-element list for a single emit.
+
+        Rate control (at most one, not combined with batch):
+          debounce=0.2            deliver the latest event after 0.2s without new ones
+          throttle=(10, 1.0)      at most 10 calls per second, extra events dropped
+          coalesce=key_fn         every coalesce_interval, deliver the latest event per key
+
+        With weak=True only a weak reference (WeakMethod for bound methods) is kept;
+        the subscription is dropped once the callback's owner is garbage collected.
+        Returns a Subscription handle whose unsubscribe() avoids scanning listeners.
+        Listeners with a higher priority are called (or, for emit_async, started) first.
+        """
+        options = [option is not None for option in (debounce, throttle, coalesce)]
+        if any(options) and (sum(options) > 1 or batch):
+            raise ValueError("use one of debounce, throttle or coalesce, without batch")
+        def build(call: Callable) -> _Listener:
+            rate = None
+            if any(options):
+                rate = _RateControl(self, call, debounce, throttle, coalesce, coalesce_interval)
+            return _Listener(call, batch, rate, priority=priority)
+
+        return self._subscribe(False, event_name, callback, weak, build)
+
+    def once(self, event_name: str, callback: Callable, weak: bool = False, priority: int = 0) -> Subscription:
         """Subscribe to event once - callback will be called only on first emission"""
-        if event_name not in self._once_listeners:
-            self._once_listeners[event_name] = []
-        self._once_listeners[event_name].append(callback)
+        return self._subscribe(True, event_name, callback, weak,
+                               lambda call: _Listener(call, priority=priority))
+
+    def _table(self, once: bool) -> Tuple[Dict[str, Tuple[_Listener, ...]], _PatternIndex]:
+        return (self._once_listeners, self._once_index) if once else (self._listeners, self._index)
+
+    def _subscribe(self, once: bool, event_name: str, callback: Callable, weak: bool,
+                   build: Callable[[Callable], _Listener]) -> Subscription:
+        """Copy-on-write append: emits keep iterating the tuple they already read"""
+        target = None
+        if weak:
+            handle_ref: List[Subscription] = []
+            callback, target = _weak_callback(callback, lambda: handle_ref and handle_ref[0].unsubscribe())
+        listener = build(callback)
+        listener.target = target
+        subscription = Subscription(self, once, event_name, listener)
+        if weak:
+            handle_ref.append(subscription)
+
+        table, index = self._table(once)
+        with self._write_lock:
+            listener.seq = next(self._seq)
+            current = table.get(event_name, ())
+            # Keep each tuple sorted by priority; equal priorities stay in registration order
+            position = len(current)
+            while position and current[position - 1].priority < listener.priority:
+                position -= 1
+            table[event_name] = current[:position] + (listener,) + current[position:]
+            if listener.priority:
+                self._prioritized = True
+            if index.add(event_name):
+                self._invalidate()
+        return subscription
+
+    def _ordered(self, table: Dict[str, Tuple[_Listener, ...]], patterns: List[str]) -> Iterable[_Listener]:
+        """Listeners for the matched patterns, merged by priority when any listener has one"""
+        if len(patterns) == 1:
+            return table.get(patterns[0], ())
+        groups = [table.get(pattern, ()) for pattern in patterns]
+        if self._prioritized:
+            return heapq.merge(*groups, key=_Listener.order)
+        return itertools.chain.from_iterable(groups)
+
+    def _unsubscribe(self, once: bool, event_name: str, listener: _Listener) -> bool:
+        """Deactivate a listener in O(1); the tuple is compacted once half of it is dead"""
+        table, index = self._table(once)
+        with self._write_lock:
+            if not listener.active:
+                return False
+            listener.active = False
+            key = (once, event_name)
+            dead = self._dead.get(key, 0) + 1
+            current = table.get(event_name, ())
+            if dead * 2 >= len(current):
+                self._replace(table, index, event_name, tuple(entry for entry in current if entry.active))
+            else:
+                self._dead[key] = dead
+            return True
+
+    def _replace(self, table: Dict[str, Tuple[_Listener, ...]], index: _PatternIndex,
+                 event_name: str, remaining: Tuple[_Listener, ...]) -> None:
+        """Swap in a new listener tuple, unindexing the pattern when it becomes empty (lock held)"""
+        self._dead.pop((table is self._once_listeners, event_name), None)
+        if remaining:
+            table[event_name] = remaining
+        elif table.pop(event_name, None) is not None and index.discard(event_name):
+            self._invalidate()
+
+    @staticmethod
+    def _without(listeners: Tuple[_Listener, ...], callback: Callable) -> Tuple[_Listener, ...]:
+        """Live listeners minus the first one registered with callback"""
+        remaining = [listener for listener in listeners if listener.active]
+        for position, listener in enumerate(remaining):
+            if listener.registered_with(callback):
+                listener.active = False
+                del remaining[position]
+                break
+        return tuple(remaining)
 
     def off(self, event_name: str, callback: Callable = None) -> None:
         """Unsubscribe from event - removes specific callback or all callbacks for event"""
-        # Remove from regular listeners
-        if event_name in self._listeners:
-            if callback is None:
-                # Remove all listeners for this event
-                del self._listeners[event_name]
-            else:
-                # Remove specific callback
-                if callback in self._listeners[event_name]:
-                    self._listeners[event_name].remove(callback)
-                # Clean up empty list
-                if not self._listeners[event_name]:
-                    del self._listeners[event_name]
-        
-        # Remove from once listeners
-        if event_name in self._once_listeners:
-            if callback is None:
-                del self._once_listeners[event_name]
-            else:
-                if callback in self._once_listeners[event_name]:
-                    self._once_listeners[event_name].remove(callback)
-                if not self._once_listeners[event_name]:
-                    del self._once_listeners[event_name]
+        with self._write_lock:
+            for table, index in ((self._listeners, self._index), (self._once_listeners, self._once_index)):
+                if event_name in table:
+                    # Remove all listeners for this event, or just the specific callback
+                    if callback is None:
+                        for listener in table[event_name]:
+                            listener.active = False
+                        remaining = ()
+                    else:
+                        remaining = self._without(table[event_name], callback)
+                    self._replace(table, index, event_name, remaining)
+
+    def _take_once(self, patterns: List[str]) -> List[_Listener]:
+        """Claim and detach once listeners for patterns - each fires exactly once, even across threads"""
+        if not patterns:
+            return []
+        claimed = [listener for listener in self._ordered(self._once_listeners, patterns)
+                   if listener.active and listener.claim()]
+        if claimed:
+            with self._write_lock:
+                for pattern in patterns:
+                    current = self._once_listeners.get(pattern)
+                    if current is not None:
+                        for listener in claimed:
+                            listener.active = False
+                        remaining = tuple(listener for listener in current if listener.active)
+                        self._replace(self._once_listeners, self._once_index, pattern, remaining)
+        return claimed
+
+    @staticmethod
+    def _as_event(item: Union[Event, str, tuple], source: str) -> Event:
+        """Build an Event from an Event, an event name, or a (name, data[, source]) tuple"""
+        if isinstance(item, Event):
+            return item
+        if isinstance(item, str):
+            return Event(name=item, data=None, source=source)
+        return Event(item[0], item[1] if len(item) > 1 else None,
+                     source=item[2] if len(item) > 2 else source)
 
     def emit(self, event_name: str, data: Any = None, source: str = "") -> int:
         """Emit event synchronously, returns number of listeners called"""
         event = Event(name=event_name, data=data, source=source)
         
+        listeners_called = 0
+        patterns, once_patterns, recorded = self._resolve(event_name)
+        
         # Add to history if enabled
-        if self._keep_history:
-            self._history.append(event)
-            # Maintain history limit
-            if len(self._history) > self._history_limit:
-                self._history.pop(0)
+        if recorded:
+            self._record(event)
         
-        listeners_called = 0
+        metrics = self._metrics
         
         # Call regular listeners (including wildcard matches)
-        for pattern, callbacks in self._listeners.items():
-            if fnmatch.fnmatch(event_name, pattern):
-                for callback in callbacks:
-                    callback(event)
-                    listeners_called += 1
-        
-        # Call once listeners and remove them
-        once_to_remove = []
-        for pattern, callbacks in self._once_listeners.items():
-            if fnmatch.fnmatch(event_name, pattern):
-                for callback in callbacks:
-                    callback(event)
-                    listeners_called += 1
-                once_to_remove.append(pattern)
+        for listener in self._ordered(self._listeners, patterns):
+            if not listener.active:
+                continue
+            if listener.rate is not None:
+                # Rate-controlled: count only what the operator releases now,
+                # deferred deliveries are counted when the timer fires
+                for callback, argument in listener.rate.offer(event, None):
+                    result = callback(argument) if metrics is None else metrics.call(callback, argument)
+                    if result is not _DEAD:
+                        listeners_called += 1
+                continue
+            elif metrics is None:
+                if listener.callback([event] if listener.batch else event) is _DEAD:
+                    continue                                 # Weak target collected, not a call
+            elif metrics.call(listener.callback, [event] if listener.batch else event) is _DEAD:
+                continue
+            listeners_called += 1
         
-        # Remove once listeners that were called
-        for pattern in once_to_remove:
-            del self._once_listeners[pattern]
+        # Call once listeners, detaching them first so re-entrant emits skip them
+        for listener in self._take_once(once_patterns):
+            if metrics is None:
+                result = listener.callback(event)
+            else:
+                result = metrics.call(listener.callback, event)
+            if result is not _DEAD:
+                listeners_called += 1
         
+        if metrics is not None:
+            metrics.emitted(event_name, listeners_called)
         return listeners_called
 
-    async def emit_async(self, event_name: str, data: Any = None) -> int:
-        """Emit event asynchronously - runs callbacks concurrently"""
+    def _plan_batch(self, batch: List[Event], loop: asyncio.AbstractEventLoop = None) -> List[Tuple[Callable, Any]]:
+        """Resolve listeners once per distinct name, returns ordered (callback, argument) calls"""
+        resolved: Dict[str, Tuple[List[_Listener], List[str]]] = {}
+        batched: Dict[int, Tuple[_Listener, List[Event]]] = {}   # id(listener) -> (listener, events)
+        fired_once: Set[str] = set()
+        calls: List[Tuple[Callable, Any]] = []
+
+        for event in batch:
+            entry = resolved.get(event.name)
+            if entry is None:
+                patterns, once_patterns, _ = self._resolve(event.name)
+                listeners = [listener for listener in self._ordered(self._listeners, patterns)
+                             if listener.active]
+                entry = resolved[event.name] = (listeners, once_patterns)
+            listeners, once_patterns = entry
+
+            for listener in listeners:
+                if listener.rate is not None:
+                    calls.extend(listener.rate.offer(event, loop))
+                elif listener.batch:
+                    slot = batched.get(id(listener))
+                    if slot is None:
+                        slot = batched[id(listener)] = (listener, [])
+                    slot[1].append(event)
+                else:
+                    calls.append((listener.callback, event))
+
+            # Once listeners fire on the first matching event of the batch only
+            pending = [pattern for pattern in once_patterns if pattern not in fired_once]
+            if pending:
+                fired_once.update(pending)
+                calls.extend((listener.callback, event) for listener in self._take_once(pending))
+
+        calls.extend((listener.callback, events) for listener, events in batched.values())
+        return calls
+
+    def emit_many(self, events: Iterable[Union[Event, str, tuple]], source: str = "") -> int:
+        """Emit a batch of events synchronously, returns number of listener calls
+
+        Items are Event objects, event names, or (name, data[, source]) tuples;
+        Event objects keep their own timestamp. Listener lookup happens once per
+        distinct event name and history is appended in bulk. Batch listeners are
+        called once, after the per-event listeners, with every event of the batch
+        they match.
+        """
+        batch = [self._as_event(item, source) for item in events]
+        self._record_batch(batch)
+
+        calls = self._plan_batch(batch)
+        metrics = self._metrics
+        made = 0
+        for callback, argument in calls:
+            result = callback(argument) if metrics is None else metrics.call(callback, argument)
+            if result is not _DEAD:                          # Weak target collected, not a call
+                made += 1
+        if metrics is not None:
+            self._count_batch(metrics, batch, calls)
+        return made
+
+    @staticmethod
+    def _count_batch(metrics: EmitterMetrics, batch: List[Event], calls: List[Tuple[Callable, Any]]) -> None:
+        """Emit and listener-call counts per event name for a batch"""
+        emits: Dict[str, int] = {}
+        for event in batch:
+            emits[event.name] = emits.get(event.name, 0) + 1
+        invoked: Dict[str, int] = {}
+        for _, argument in calls:
+            name = _event_name_of(argument)
+            invoked[name] = invoked.get(name, 0) + 1
+        for name, count in emits.items():
+            metrics.emitted(name, invoked.get(name, 0), count)
+
+    async def _dispatch_all(self, calls: List[Tuple[Callable, Any]]) -> int:
+        """Run listener calls concurrently, sync ones through the dispatcher, reporting failures"""
+        dispatcher = self.dispatcher
+        metrics = self._metrics
+        awaitables = []
+        for callback, argument in calls:
+            if asyncio.iscoroutinefunction(callback):
+                awaitables.append(callback(argument) if metrics is None
+                                  else metrics.call_async(callback, argument))
+            else:
+                # Sync callbacks go to the bounded worker pool
+                job = callback if metrics is None else metrics.timed(callback)
+                awaitables.append(await dispatcher.submit(job, argument))
+                if metrics is not None:
+                    metrics.observe_queue(dispatcher.pending, dispatcher.running)
+
+        if awaitables:
+            results = await asyncio.gather(*awaitables, return_exceptions=True)
+            for (callback, argument), result in zip(calls, results):
+                # Sync failures were already reported by the dispatcher
+                if isinstance(result, BaseException) and asyncio.iscoroutinefunction(callback):
+                    dispatcher.report(result, argument, callback)
+        return len(awaitables)
+
+    async def emit_async(self, event_name: str, data: Any = None, partition_key: Any = None) -> int:
+        """Emit event asynchronously - runs callbacks concurrently
+
+        Events with the same partition key (given here or derived by the
+        emitter's partition_by) are delivered strictly in emit order.
+        """
         event = Event(name=event_name, data=data)
         
-        # Add to history if enabled
-        if self._keep_history:
-            self._history.append(event)
-            if len(self._history) > self._history_limit:
-                self._history.pop(0)
+        patterns, once_patterns, recorded = self._resolve(event_name)
         
-        tasks = []
+        # Add to history if enabled
+        if recorded:
+            self._record(event)
         
-        # Collect all matching callbacks
-        for pattern, callbacks in self._listeners.items():
-            if fnmatch.fnmatch(event_name, pattern):
-                for callback in callbacks:
-                    # Wrap sync callbacks to make them async-compatible
-                    if asyncio.iscoroutinefunction(callback):
-                        tasks.append(callback(event))
-                    else:
-                        tasks.append(asyncio.create_task(asyncio.to_thread(callback, event)))
+        loop = asyncio.get_running_loop()
+        calls = []
+        for listener in self._ordered(self._listeners, patterns):
+            if not listener.active:
+                continue
+            if listener.rate is not None:
+                calls.extend(listener.rate.offer(event, loop))
+            else:
+                calls.append((listener.callback, [event] if listener.batch else event))
         
         # Handle once listeners
-        once_to_remove = []
-        for pattern, callbacks in self._once_listeners.items():
-            if fnmatch.fnmatch(event_name, pattern):
-                for callback in callbacks:
-                    if asyncio.iscoroutinefunction(callback):
-                        tasks.append(callback(event))
-                    else:
-                        tasks.append(asyncio.create_task(asyncio.to_thread(callback, event)))
-                once_to_remove.append(pattern)
-        
-        # Remove once listeners
-        for pattern in once_to_remove:
-            del self._once_listeners[pattern]
+        calls.extend((listener.callback, event) for listener in self._take_once(once_patterns))
         
         # Execute all callbacks concurrently
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
-        
-        return len(tasks)
+        if self._metrics is not None:
+            self._metrics.emitted(event_name, len(calls))
+        if partition_key is None and self._partition_by is not None:
+            partition_key = self._partition_by(event)
+        if partition_key is None:
+            return await self._dispatch_all(calls)
+        return await self._in_turn(partition_key, calls)
+
+    async def emit_many_async(self, events: Iterable[Union[Event, str, tuple]], source: str = "",
+                              partition_key: Any = None) -> int:
+        """Emit a batch of events asynchronously - runs all listener calls concurrently
+
+        With a partition_key the whole batch is ordered behind earlier emits for that key.
+        Otherwise, when the emitter has a partition_by, the batch is split by each event's
+        key: every key's events are delivered in order behind earlier emits for that key,
+        and batch listeners get one call per key.
+        """
+        batch = [self._as_event(item, source) for item in events]
+        self._record_batch(batch)
+
+        loop = asyncio.get_running_loop()
+        if partition_key is not None or self._partition_by is None:
+            groups = {partition_key: batch}
+        else:
+            groups: Dict[Any, List[Event]] = {}
+            for event in batch:
+                groups.setdefault(self._partition_by(event), []).append(event)
 
-    def replay(self, event_pattern: str, callback: Callable) -> int:
-        """Replay historical events matching pattern to a specific callback"""
+        runs = []
+        for key, group in groups.items():
+            calls = self._plan_batch(group, loop)
+            if self._metrics is not None:
+                self._count_batch(self._metrics, group, calls)
+            runs.append(self._dispatch_all(calls) if key is None else self._in_turn(key, calls))
+        if len(runs) == 1:
+            return await runs[0]
+        return sum(await asyncio.gather(*runs))
+
+    def _in_turn(self, key: Any, calls: List[Tuple[Callable, Any]]) -> asyncio.Task:
+        """Task dispatching calls once every earlier delivery for key has finished
+
+        The turn is taken before returning, without yielding, so same-key
+        deliveries start in the order they were emitted even across tasks.
+        """
+        previous = self._partitions.get(key)
+        turn = self._partitions[key] = asyncio.get_running_loop().create_future()
+
+        async def deliver() -> int:
+            if previous is not None:
+                await asyncio.shield(previous)
+            return await self._dispatch_all(calls)
+
+        def finished(_) -> None:
+            # A delivery cancelled while waiting passes its turn on only after the earlier one
+            if previous is None or previous.done():
+                self._end_turn(key, turn)
+            else:
+                previous.add_done_callback(lambda _: self._end_turn(key, turn))
+
+        task = asyncio.ensure_future(deliver())
+        task.add_done_callback(finished)
+        return task
+
+    def _end_turn(self, key: Any, turn: asyncio.Future) -> None:
+        turn.set_result(None)
+        if self._partitions.get(key) is turn:
+            del self._partitions[key]
+
+    def stream(self, event_pattern: str = "*", maxsize: int = 1000,
+               overflow_policy: str = "drop_oldest") -> EventStream:
+        """Pull-based subscription: `async for event in emitter.stream("user.*")`"""
+        return EventStream(self, event_pattern, maxsize, overflow_policy)
+
+    def replay(self, event_pattern: str, callback: Callable,
+               since: datetime = None, until: datetime = None, from_offset: int = None) -> int:
+        """Replay historical events matching pattern (and optional time range) to a specific callback
+
+        With a durable event log, replay streams from the log when from_offset is
+        given or when in-memory history is off.
+        """
+        if self._event_log is not None and (from_offset is not None or not self._keep_history):
+            return self._event_log.replay(event_pattern, callback, from_offset=from_offset or 0,
+                                          since=since, until=until)
         if not self._keep_history:
             return 0
         
+        with self._history_lock:
+            events = self._history.select(event_pattern, since=since, until=until)
+        
         replayed = 0
-        # Find and replay matching events from history
-        for event in self._history:
-            if fnmatch.fnmatch(event.name, event_pattern):
-                callback(event)
-                replayed += 1
+        # Find matching events through the history indexes and replay them
+        for event in events:
+            callback(event)
+            replayed += 1
         
         return replayed
 
-    def get_history(self, event_pattern: str = "*", limit: int = None) -> List[Event]:
-        """Get event history filtered by pattern with optional limit"""
+    def get_history(self, event_pattern: str = "*", limit: int = None,
+                    since: datetime = None, until: datetime = None) -> List[Event]:
+        """Get event history filtered by pattern and time range with optional limit"""
         if not self._keep_history:
             return []
         
-        # Filter events by pattern
-        matching_events = [
-            event for event in self._history 
-            if fnmatch.fnmatch(event.name, event_pattern)
-        ]
-        
-        # Apply limit if specified
-        if limit is not None:
-            matching_events = matching_events[-limit:]
-        
-        return matching_events
\ No newline at end of file
+        with self._history_lock:
+            return self._history.select(event_pattern, limit=limit, since=since, until=until)
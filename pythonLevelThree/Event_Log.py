@@ -0,0 +1,332 @@
+# Durable Event Log
+# Append-only, segmented event log backend for EventEmitter so replay survives restarts
+#
+# Layout on disk (one directory per log):
+#   00000000000000000000.log     records of the segment starting at offset 0
+#   00000000000000000000.index   sparse (offset, timestamp, position) entries for that segment
+#
+# Record: header <QqHHII> = offset, timestamp ns, name length, source length,
+#         data length, crc32 of the body; followed by name, source and pickled data
+#
+# Timestamps are the events' own and need not increase: events are stamped before they
+# reach the log, and prebuilt events keep theirs. Each segment tracks its highest stamp
+# and the most any stamp fell behind the running highest one (its lag); time-range reads
+# widen their bounds by the lag. A closed segment stores both in a last index entry
+# with offset _SEALED. Appends are serialized by a lock, reads need none.
+
+from typing import Callable, Iterator, List, Optional, Tuple
+from datetime import datetime
+import bisect
+import fnmatch
+import mmap
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+import zlib
+
+from Event_DrivenArchitecture import Event, to_epoch_ns, to_monotonic_ns
+
+_RECORD = struct.Struct("<QqHHII")                          # Record header
+_INDEX = struct.Struct("<QqQ")                              # Index entry: offset, timestamp ns, position
+_SUFFIX_LOG = ".log"
+_SUFFIX_INDEX = ".index"
+_SEALED = 2 ** 64 - 1                                       # Index trailer offset: (peak, lag) of a closed segment
+
+
+class _Segment:
+    """One segment file plus its in-memory copy of the sparse index"""
+
+    def __init__(self, directory: str, base_offset: int):
+        self.base_offset = base_offset                      # Offset of the first record
+        self.path = os.path.join(directory, f"{base_offset:020d}{_SUFFIX_LOG}")
+        self.index_path = os.path.join(directory, f"{base_offset:020d}{_SUFFIX_INDEX}")
+        self.offsets: List[int] = []                        # Indexed record offsets
+        self.stamps: List[int] = []                         # Indexed record timestamps (ns)
+        self.peaks: List[int] = []                          # Running max of the indexed timestamps
+        self.positions: List[int] = []                      # Indexed record file positions
+        self.next_offset = base_offset                      # Offset the next record will get
+        self.last_stamp = 0                                 # Timestamp of the newest record
+        self.peak: Optional[int] = 0                        # Highest timestamp, None if unknown
+        self.lag: Optional[int] = 0                         # Most a stamp fell below the peak so far, None if unknown
+        self.size = 0                                       # Bytes of valid records
+
+    def note(self, stamp: int) -> None:
+        """Account for a record's timestamp in peak and lag"""
+        if stamp >= self.peak:
+            self.peak = stamp
+        elif self.peak - stamp > self.lag:
+            self.lag = self.peak - stamp
+
+    def add_entry(self, offset: int, stamp: int, position: int) -> None:
+        self.offsets.append(offset)
+        self.stamps.append(stamp)
+        self.peaks.append(max(stamp, self.peaks[-1]) if self.peaks else stamp)
+        self.positions.append(position)
+
+    def trailer(self) -> bytes:
+        """Index entry sealing a closed segment with its peak and lag"""
+        return _INDEX.pack(_SEALED, self.peak, self.lag)
+
+    def load_index(self) -> None:
+        """Read the index file written alongside the segment"""
+        with open(self.index_path, "rb") as fh:
+            raw = fh.read()
+        self.peak = self.lag = None                         # Unless the segment was sealed
+        for offset, stamp, position in _INDEX.iter_unpack(raw[:len(raw) - len(raw) % _INDEX.size]):
+            if offset == _SEALED:
+                self.peak, self.lag = stamp, position
+            else:
+                self.add_entry(offset, stamp, position)
+
+    def scan(self, index_interval: int, closed: bool) -> None:
+        """Rebuild index and tail state by walking the records, dropping a torn tail"""
+        self.offsets, self.stamps, self.peaks, self.positions = [], [], [], []
+        self.peak = self.lag = 0
+        position = 0
+        with open(self.path, "rb") as fh:
+            raw = fh.read()
+        while position + _RECORD.size <= len(raw):
+            offset, stamp, name_len, source_len, data_len, crc = _RECORD.unpack_from(raw, position)
+            body_start = position + _RECORD.size
+            body_end = body_start + name_len + source_len + data_len
+            if body_end > len(raw) or zlib.crc32(raw[body_start:body_end]) != crc:
+                break
+            if (offset - self.base_offset) % index_interval == 0:
+                self.add_entry(offset, stamp, position)
+            self.next_offset = offset + 1
+            self.last_stamp = stamp
+            self.note(stamp)
+            position = body_end
+        self.size = position
+        if position != len(raw):
+            with open(self.path, "r+b") as fh:
+                fh.truncate(position)
+        with open(self.index_path, "wb") as fh:
+            fh.write(b"".join(_INDEX.pack(*entry) for entry in zip(self.offsets, self.stamps, self.positions)))
+            if closed:
+                fh.write(self.trailer())
+
+    def seek(self, from_offset: int, since_ns: Optional[int]) -> int:
+        """File position of the indexed record at or before the requested start"""
+        slot = bisect.bisect_right(self.offsets, from_offset) - 1
+        if since_ns is not None and self.lag is not None:
+            # Records before an entry are at most its running peak + lag, so every
+            # record ahead of an entry whose peak is below since - lag is too old
+            slot = max(slot, bisect.bisect_left(self.peaks, since_ns - self.lag) - 1)
+        return self.positions[slot] if slot >= 0 else 0
+
+
+class EventLog:
+    """Append-only segmented event log with sparse indexes and memory-mapped replay"""
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, index_interval: int = 64,
+                 max_segments: int = None, retention_seconds: float = None,
+                 flush_every: int = 1, fsync: bool = False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes                  # Roll to a new segment past this size
+        self.index_interval = index_interval                # Records between index entries
+        self.max_segments = max_segments                    # Keep at most this many segments
+        self.retention_seconds = retention_seconds          # Drop segments older than this
+        self.flush_every = flush_every                      # Records buffered before a flush
+        self.fsync = fsync                                  # fsync on every flush
+        self._segments: List[_Segment] = []
+        self._log_file = None
+        self._index_file = None
+        self._unflushed = 0
+        self._lock = threading.RLock()                      # Serializes append, roll, flush and close
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    # ---------------- SEGMENTS ----------------
+    def _open(self) -> None:
+        """Load existing segments, recovering the newest one after an unclean stop"""
+        bases = sorted(int(name[:-len(_SUFFIX_LOG)]) for name in os.listdir(self.directory)
+                       if name.endswith(_SUFFIX_LOG))
+        for base in bases:
+            segment = _Segment(self.directory, base)
+            if base == bases[-1] or not os.path.exists(segment.index_path):
+                segment.scan(self.index_interval, closed=base != bases[-1])
+            else:
+                # Closed segment: trust its index, the file mtime stands in for the newest stamp
+                segment.load_index()
+                segment.size = os.path.getsize(segment.path)
+                segment.next_offset = bases[bases.index(base) + 1]
+                segment.last_stamp = int(os.path.getmtime(segment.path) * 1_000_000_000)
+            self._segments.append(segment)
+        if not self._segments:
+            self._segments.append(_Segment(self.directory, 0))
+        self._open_active()
+
+    def _open_active(self) -> None:
+        active = self._segments[-1]
+        self._log_file = open(active.path, "ab")
+        self._index_file = open(active.index_path, "ab")
+
+    def _roll(self) -> None:
+        """Close the active segment and start a new one, then apply retention"""
+        self._index_file.write(self._segments[-1].trailer())
+        self.flush()
+        self._log_file.close()
+        self._index_file.close()
+        self._segments.append(_Segment(self.directory, self.next_offset))
+        self._open_active()
+        self._apply_retention()
+
+    def _apply_retention(self) -> None:
+        """Delete the oldest closed segments beyond max_segments or retention_seconds"""
+        cutoff = None
+        if self.retention_seconds is not None:
+            cutoff = time.time_ns() - int(self.retention_seconds * 1_000_000_000)
+        while len(self._segments) > 1:
+            oldest = self._segments[0]
+            too_many = self.max_segments is not None and len(self._segments) > self.max_segments
+            expired = cutoff is not None and oldest.last_stamp < cutoff
+            if not (too_many or expired):
+                break
+            for path in (oldest.path, oldest.index_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._segments.pop(0)
+
+    @property
+    def first_offset(self) -> int:
+        """Offset of the oldest retained record"""
+        return self._segments[0].base_offset
+
+    @property
+    def next_offset(self) -> int:
+        """Offset the next appended record will get"""
+        return self._segments[-1].next_offset
+
+    # ---------------- WRITE ----------------
+    def append(self, event: Event) -> int:
+        """Append one event, returns its offset"""
+        with self._lock:
+            return self._append(event)
+
+    def _append(self, event: Event) -> int:
+        active = self._segments[-1]
+        if active.size >= self.segment_bytes:
+            self._roll()
+            active = self._segments[-1]
+
+        offset = active.next_offset
+        stamp = event.epoch_ns
+        name = event.name.encode()
+        source = (event.source or "").encode()
+        data = pickle.dumps(event.data, pickle.HIGHEST_PROTOCOL)
+        body = name + source + data
+        record = _RECORD.pack(offset, stamp, len(name), len(source), len(data), zlib.crc32(body)) + body
+
+        if (offset - active.base_offset) % self.index_interval == 0:
+            active.add_entry(offset, stamp, active.size)
+            self._index_file.write(_INDEX.pack(offset, stamp, active.size))
+        active.note(stamp)                                  # Before the record can be read
+        self._log_file.write(record)
+        active.size += len(record)
+        active.next_offset = offset + 1
+        active.last_stamp = stamp
+
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+        return offset
+
+    def extend(self, events) -> int:
+        """Append a batch of events contiguously, returns the offset of the last one"""
+        with self._lock:
+            offset = self.next_offset - 1
+            for event in events:
+                offset = self._append(event)
+            return offset
+
+    def flush(self) -> None:
+        """Push buffered records to the OS (and to disk when fsync is on)"""
+        with self._lock:
+            self._log_file.flush()
+            self._index_file.flush()
+            if self.fsync:
+                os.fsync(self._log_file.fileno())
+            self._unflushed = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log_file is not None:
+                self.flush()
+                self._log_file.close()
+                self._index_file.close()
+                self._log_file = self._index_file = None
+
+    def __enter__(self) -> "EventLog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------------- READ ----------------
+    def read(self, event_pattern: str = "*", from_offset: int = 0,
+             since: datetime = None, until: datetime = None) -> Iterator[Tuple[int, Event]]:
+        """Stream (offset, event) pairs matching pattern, one mapped segment at a time"""
+        with self._lock:
+            if self._log_file is not None and self._unflushed:
+                self.flush()
+            segments = list(self._segments)
+        matcher = None if event_pattern == "*" else re.compile(fnmatch.translate(event_pattern)).match
+        since_ns = to_epoch_ns(since) if since is not None else None
+        until_ns = to_epoch_ns(until) + 999 if until is not None else None     # Covers its whole microsecond
+
+        for position, segment in enumerate(segments):
+            following = segments[position + 1] if position + 1 < len(segments) else None
+            if following is not None and following.base_offset <= from_offset:
+                continue
+            if since_ns is not None and segment.peak is not None and segment.peak < since_ns:
+                continue
+            if segment.size == 0:
+                continue
+            try:
+                yield from self._read_segment(segment, matcher, from_offset, since_ns, until_ns)
+            except FileNotFoundError:
+                continue                                    # Dropped by retention while we read
+
+    def _read_segment(self, segment: _Segment, matcher: Optional[Callable], from_offset: int,
+                      since_ns: Optional[int], until_ns: Optional[int]) -> Iterator[Tuple[int, Event]]:
+        with open(segment.path, "rb") as fh:
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                end = min(segment.size, len(mapped))
+                lag = segment.lag                           # Read after mapping: covers every mapped record
+                peak = 0
+                position = segment.seek(from_offset, since_ns)
+                while position + _RECORD.size <= end:
+                    offset, stamp, name_len, source_len, data_len, _ = _RECORD.unpack_from(mapped, position)
+                    name_start = position + _RECORD.size
+                    data_start = name_start + name_len + source_len
+                    position = data_start + data_len
+                    if offset < from_offset or (since_ns is not None and stamp < since_ns):
+                        continue
+                    if until_ns is not None and stamp > until_ns:
+                        # Every later record is at least peak - lag: stop once that passes until
+                        peak = max(peak, stamp)
+                        if lag is not None and peak - lag > until_ns:
+                            return
+                        continue
+                    name = mapped[name_start:name_start + name_len].decode()
+                    if matcher is not None and not matcher(name):
+                        continue
+                    # Only matching records pay for unpickling their payload
+                    event = Event(name=name,
+                                  data=pickle.loads(mapped[data_start:position]),
+                                  timestamp_ns=to_monotonic_ns(stamp),
+                                  source=mapped[name_start + name_len:data_start].decode())
+                    yield offset, event
+
+    def replay(self, event_pattern: str, callback: Callable, from_offset: int = 0,
+               since: datetime = None, until: datetime = None) -> int:
+        """Replay logged events matching pattern to a callback, returns the number replayed"""
+        replayed = 0
+        for _, event in self.read(event_pattern, from_offset, since, until):
+            callback(event)
+            replayed += 1
+        return replayed
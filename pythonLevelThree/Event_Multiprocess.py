@@ -0,0 +1,147 @@
+# Cross-Process Event Fan-out
+# Delivers events emitted on an EventEmitter to listener worker processes,
+# so CPU-heavy listeners scale across cores while on/emit stay unchanged.
+#
+#   emitter = EventEmitter()
+#   fanout = ProcessFanout(emitter)
+#   fanout.on("order.*", score_order, workers=4)   # score_order runs in 4 processes
+#   emitter.emit("order.created", {...})           # routed round-robin to a worker
+#   fanout.close()
+
+from typing import Any, Callable, Dict, List, Tuple
+import multiprocessing
+import pickle
+import sys
+
+from Event_DrivenArchitecture import Event, EventEmitter, Subscription, to_monotonic_ns
+
+_STOP = None                                                # Sentinel telling a worker to exit
+
+
+def encode_events(events: List[Event]) -> bytes:
+    """Compact wire format: one pickled list of (name, data, source, epoch ns) tuples"""
+    return pickle.dumps([(event.name, event.data, event.source, event.epoch_ns) for event in events],
+                        pickle.HIGHEST_PROTOCOL)
+
+
+def decode_events(payload: bytes) -> List[Event]:
+    return [Event(name, data, source=source, timestamp_ns=to_monotonic_ns(stamp))
+            for name, data, source, stamp in pickle.loads(payload)]
+
+
+def _worker_main(inbox, callback: Callable, processed, failed) -> None:
+    """Worker process loop: decode batches and run the listener on every event"""
+    while True:
+        payload = inbox.get()
+        if payload is _STOP:
+            break
+        for event in decode_events(payload):
+            try:
+                callback(event)
+                processed.value += 1
+            except Exception as e:
+                failed.value += 1
+                print(f"Error in worker listener for {event.name!r}: {e!r}", file=sys.stderr)
+
+
+class _Worker:
+    """One subscriber process with its inbox and shared delivery counters"""
+
+    def __init__(self, context, callback: Callable, queue_size: int):
+        self.inbox = context.Queue(queue_size)
+        self.processed = context.Value("q", 0)              # Written by the worker process
+        self.failed = context.Value("q", 0)
+        self.sent = 0                                       # Events handed to the transport
+        self.process = context.Process(target=_worker_main, daemon=True,
+                                       args=(self.inbox, callback, self.processed, self.failed))
+        self.process.start()
+
+    def stats(self) -> dict:
+        return {
+            "pid": self.process.pid,
+            "alive": self.process.is_alive(),
+            "sent": self.sent,
+            "processed": self.processed.value,
+            "failed": self.failed.value,
+        }
+
+
+class _WorkerGroup:
+    """Workers sharing one pattern subscription, fed round-robin"""
+
+    def __init__(self, event_pattern: str, workers: List[_Worker]):
+        self.event_pattern = event_pattern
+        self.workers = workers
+        self._next = 0
+
+    def forward(self, events: List[Event]) -> None:
+        """Batch listener registered on the emitter"""
+        worker = self.workers[self._next]
+        self._next = (self._next + 1) % len(self.workers)
+        worker.inbox.put(encode_events(events))
+        worker.sent += len(events)
+
+
+class ProcessFanout:
+    """Runs listeners for an EventEmitter in worker processes
+
+    Each on() call starts `workers` processes for one pattern. The emitter sees a
+    single batch listener per pattern, which serializes matching events and hands
+    them to the group's workers round-robin over multiprocessing queues. A full
+    worker inbox blocks the publisher, which keeps memory bounded.
+
+    Subscribing goes through ProcessFanout.on rather than EventEmitter.on because
+    it owns more than a listener: the callback must be picklable, the call starts
+    processes, and those processes live until close(). EventEmitter stays free of
+    multiprocessing; what it gets is an ordinary batch subscription.
+    """
+
+    def __init__(self, emitter: EventEmitter, queue_size: int = 10_000, start_method: str = None):
+        self.emitter = emitter
+        self.queue_size = queue_size                        # Batches buffered per worker
+        self._context = multiprocessing.get_context(start_method)
+        self._groups: List[Tuple[_WorkerGroup, Callable]] = []
+
+    def on(self, event_pattern: str, callback: Callable, workers: int = 1) -> Subscription:
+        """Subscribe a picklable callback in `workers` processes to events matching pattern
+
+        Returns the emitter subscription; unsubscribing it stops new deliveries,
+        the workers keep running until close().
+        """
+        group = _WorkerGroup(event_pattern, [_Worker(self._context, callback, self.queue_size)
+                                             for _ in range(workers)])
+        subscription = self.emitter.on(event_pattern, group.forward, batch=True)
+        self._groups.append((group, callback))
+        return subscription
+
+    def stats(self) -> Dict[str, Any]:
+        """Delivery statistics per subscription and worker"""
+        return {
+            f"{group.event_pattern} -> {getattr(callback, '__qualname__', callback)}": {
+                "workers": [worker.stats() for worker in group.workers],
+                "sent": sum(worker.sent for worker in group.workers),
+                "processed": sum(worker.processed.value for worker in group.workers),
+            }
+            for group, callback in self._groups
+        }
+
+    def close(self, timeout: float = 10.0) -> Dict[str, Any]:
+        """Unsubscribe, let workers drain their inboxes and stop, returns final stats"""
+        for group, _ in self._groups:
+            self.emitter.off(group.event_pattern, group.forward)
+            for worker in group.workers:
+                worker.inbox.put(_STOP)
+        for group, _ in self._groups:
+            for worker in group.workers:
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+        final = self.stats()
+        self._groups = []
+        return final
+
+    def __enter__(self) -> "ProcessFanout":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Optional, Callable
 import importlib
+import itertools
 import os
 import inspect
+import weakref
 
 
 # ---------------- META & BASE PLUGIN ------------------
@@ -50,17 +52,71 @@ class Plugin(ABC):
 
 # ------------------ EVENT SYSTEM --------------------
 
+class Subscription:
+    """Handle returned by EventBus.subscribe, unsubscribes in O(1)"""
+
+    def __init__(self, bus: "EventBus", event_name: str, token: int):
+        self.bus = bus
+        self.event_name = event_name
+        self.token = token
+
+    def unsubscribe(self) -> bool:
+        return self.bus._remove(self.event_name, self.token)
+
+
 class EventBus:
     """Simple pub/sub system for plugin communication"""
 
     def __init__(self):
-        self.listeners: Dict[str, List[Callable]] = {}
+        # event name -> {token: callback or weak reference}, insertion ordered
+        self._subscriptions: Dict[str, Dict[int, Callable]] = {}
+        self._weak: Dict[int, bool] = {}
+        self._tokens = itertools.count()
 
-    def subscribe(self, event_name: str, callback: Callable):
-        self.listeners.setdefault(event_name, []).append(callback)
+    @property
+    def listeners(self) -> Dict[str, List[Callable]]:
+        """Snapshot of live callbacks per event name, in subscription order"""
+        listeners = {}
+        for event_name, callbacks in self._subscriptions.items():
+            live = [callback() if token in self._weak else callback for token, callback in callbacks.items()]
+            live = [callback for callback in live if callback is not None]
+            if live:
+                listeners[event_name] = live
+        return listeners
+
+    def subscribe(self, event_name: str, callback: Callable, weak: bool = False) -> Subscription:
+        """Register callback; weak=True holds it weakly so dead plugins drop out on their own"""
+        token = next(self._tokens)
+        if weak:
+            callback = weakref.WeakMethod(callback) if inspect.ismethod(callback) else weakref.ref(callback)
+            self._weak[token] = True
+        self._subscriptions.setdefault(event_name, {})[token] = callback
+        return Subscription(self, event_name, token)
+
+    def unsubscribe(self, event_name: str, callback: Callable) -> bool:
+        """Remove the first subscription of callback (scans; prefer Subscription.unsubscribe)"""
+        for token, registered in self._subscriptions.get(event_name, {}).items():
+            if (registered() if token in self._weak else registered) == callback:
+                return self._remove(event_name, token)
+        return False
+
+    def _remove(self, event_name: str, token: int) -> bool:
+        callbacks = self._subscriptions.get(event_name)
+        if callbacks is None or callbacks.pop(token, None) is None:
+            return False
+        self._weak.pop(token, None)
+        if not callbacks:
+            del self._subscriptions[event_name]
+        return True
 
     def emit(self, event_name: str, data: Any):
-        for callback in self.listeners.get(event_name, []):
+        for token, callback in list(self._subscriptions.get(event_name, {}).items()):
+            if token in self._weak:
+                callback = callback()
+                if callback is None:
+                    # Owner was garbage collected, prune during dispatch
+                    self._remove(event_name, token)
+                    continue
             callback(data)
 
 
@@ -130,19 +130,37 @@
 
 
 import asyncio
-from typing import Callable, Any, List, Dict
-from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Any, List, Dict, Iterable
 from datetime import datetime
 import fnmatch
 import inspect
+import sys
+import threading
+import time
 
 # ---------------- EVENT MODEL ----------------
-@dataclass
+_CLOCK_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+
 class Event:
-    name: str
-    data: Any
-    timestamp: datetime = field(default_factory=datetime.now)
-    source: str = ""
+    __slots__ = ("name", "data", "source", "timestamp_ns", "_timestamp")
+
+    def __init__(self, name: str, data: Any = None, timestamp: datetime = None, source: str = ""):
+        self.name = sys.intern(name)
+        self.data = data
+        self.source = source
+        if timestamp is None:
+            self.timestamp_ns = time.monotonic_ns()  # cheap clock, datetime built on demand
+        else:
+            self.timestamp_ns = int(timestamp.timestamp() * 1_000_000_000) - _CLOCK_OFFSET_NS
+        self._timestamp = timestamp
+
+    @property
+    def timestamp(self) -> datetime:
+        if self._timestamp is None:
+            self._timestamp = datetime.fromtimestamp((self.timestamp_ns + _CLOCK_OFFSET_NS) / 1_000_000_000)
+        return self._timestamp
 
 
 # ---------------- EVENT EMITTER ----------------
@@ -151,8 +169,16 @@ class EventEmitter:
         self._listeners: Dict[str, List[Callable]] = {}
         self._once_listeners: Dict[str, List[Callable]] = {}
         self._history: List[Event] = []
+        self._history_lock = threading.Lock()     # emit runs on the menu thread, emit_async on the loop
         self._keep_history = keep_history
         self._history_limit = history_limit
+        self._untracked: List[str] = []
+
+    def exclude_from_history(self, pattern: str):
+        self._untracked.append(pattern)
+
+    def _tracked(self, event_name: str) -> bool:
+        return not any(fnmatch.fnmatch(event_name, p) for p in self._untracked)
 
     def on(self, event_name: str, callback: Callable):
         self._listeners.setdefault(event_name, []).append(callback)
@@ -160,13 +186,20 @@ class EventEmitter:
     def once(self, event_name: str, callback: Callable):
         self._once_listeners.setdefault(event_name, []).append(callback)
 
+    def _record(self, event: Event):
+        if self._keep_history and self._tracked(event.name):
+            with self._history_lock:
+                self._history.append(event)
+                if len(self._history) > self._history_limit:
+                    self._history.pop(0)
+
+    def _snapshot(self) -> List[Event]:
+        with self._history_lock:
+            return list(self._history)
+
     def emit(self, event_name: str, data: Any = None):
         event = Event(event_name, data)
-
-        if self._keep_history:
-            self._history.append(event)
-            if len(self._history) > self._history_limit:
-                self._history.pop(0)
+        self._record(event)
 
         for pattern, callbacks in self._listeners.items():
             if fnmatch.fnmatch(event_name, pattern):
@@ -182,29 +215,82 @@ class EventEmitter:
     async def emit_async(self, event_name: str, data: Any = None):
         event = Event(event_name, data)
         tasks = []
+        loop = asyncio.get_running_loop()
+        self._record(event)
 
-        if self._keep_history:
-            self._history.append(event)
-
-        for pattern, callbacks in self._listeners.items():
+        for pattern, callbacks in list(self._listeners.items()):
             if fnmatch.fnmatch(event_name, pattern):
                 for cb in callbacks:
                     if inspect.iscoroutinefunction(cb):
                         tasks.append(cb(event))
                     else:
-                        cb(event)
+                        # sync callbacks go to the loop's worker pool, not inline on the loop
+                        tasks.append(loop.run_in_executor(None, cb, event))
 
         if tasks:
             await asyncio.gather(*tasks)
 
-    def replay(self, pattern: str):
-        for event in self._history:
-            if fnmatch.fnmatch(event.name, pattern):
-                print(f"[REPLAY] {event.name} → {event.data}")
-
-    def show_history(self):
-        for event in self._history:
-            print(f"{event.timestamp} | {event.name} | {event.data}")
+    def replay(self, pattern: str, page_size: int = 20):
+        matches = [e for e in self._snapshot() if fnmatch.fnmatch(e.name, pattern)]
+        page(matches, lambda e: f"[REPLAY] {e.name} → {e.data}", page_size)
+
+    def show_history(self, page_size: int = 20):
+        page(self._snapshot(), lambda e: f"{e.timestamp} | {e.name} | {e.data}", page_size)
+
+
+def page(events: Iterable[Event], fmt: Callable[[Event], str], page_size: int = 20):
+    shown = 0
+    for event in events:
+        if shown and shown % page_size == 0:
+            if input("-- Enter for more, q to stop -- ").strip().lower() == "q":
+                return
+        print(fmt(event))
+        shown += 1
+    if not shown:
+        print("No events")
+
+
+# ---------------- EVENT LOOP SERVICE ----------------
+class EventLoopService:
+    """One long-lived event loop on a background thread, sync listeners on a worker pool"""
+
+    def __init__(self, workers: int = 4):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="listener")
+        self.loop.set_default_executor(self.executor)
+        self._thread = threading.Thread(target=self._run, name="event-loop", daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, coro) -> Future:
+        # returns immediately, the loop thread runs the coroutine
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future.add_done_callback(self._report)
+        return future
+
+    @staticmethod
+    def _report(future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"[ERROR] async emit failed: {future.exception()!r}", file=sys.stderr)
+
+    def stop(self, timeout: float = 5.0):
+        async def drain():
+            pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            if pending:
+                await asyncio.wait(pending, timeout=timeout)
+
+        if self._thread.is_alive():
+            asyncio.run_coroutine_threadsafe(drain(), self.loop).result(timeout + 1)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+        self.executor.shutdown(wait=True)
+        self.loop.close()
 
 
 # ---------------- LISTENERS ----------------
@@ -219,6 +305,7 @@ async def async_logger(event: Event):
 # ---------------- MAIN MENU ----------------
 def main():
     emitter = EventEmitter(keep_history=True)
+    service = EventLoopService().start()
 
     # Default listeners
     emitter.on("*", log_event)
@@ -244,7 +331,8 @@ def main():
         elif choice == "2":
             name = input("Enter async event name: ")
             data = input("Enter event data: ")
-            asyncio.run(emitter.emit_async(name, data))
+            service.submit(emitter.emit_async(name, data))
+            print("Queued")
 
         elif choice == "3":
             pattern = input("Enter event pattern (e.g user.*): ")
@@ -255,6 +343,7 @@ def main():
 
         elif choice == "5":
             print("Exiting...")
+            service.stop()
             break
 
         else:
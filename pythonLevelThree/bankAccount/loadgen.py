@@ -0,0 +1,136 @@
+# load generator for server.py: C connections, each keeping P requests in flight
+#
+#   python loadgen.py --connections 16 --pipeline 8 --seconds 10
+#   python loadgen.py --spawn                  # start a local server.py for the run
+#
+# request mix: deposit / withdraw / transfer / balance over --accounts random accounts.
+# prints ops/sec and p50/p99 latency (send to reply, per request).
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+MIX = ("deposit", "withdraw", "transfer", "balance")
+
+
+def request(rng, accounts):
+    op = rng.choice(MIX)
+    amount = str(rng.randint(1, 5000) / 100)
+    if op == "transfer":
+        a, b = rng.sample(accounts, 2)
+        return {"op": op, "from": a, "to": b, "amount": amount}
+    if op == "balance":
+        return {"op": op, "account": rng.choice(accounts)}
+    return {"op": op, "account": rng.choice(accounts), "amount": amount}
+
+
+async def setup(host, port, n):
+    reader, writer = await asyncio.open_connection(host, port)
+    for i in range(n):
+        req = {"id": i, "op": "create", "type": ("savings", "checking", "business")[i % 3],
+               "owner": f"load{i}", "amount": "100000"}
+        writer.write(json.dumps(req).encode() + b"\n")
+    await writer.drain()
+    accounts = [json.loads(await reader.readline())["result"] for _ in range(n)]
+    writer.close()
+    return accounts
+
+
+async def client(host, port, accounts, pipeline, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    window = asyncio.Semaphore(pipeline)
+    sent = {}                   # request id -> send time
+    done = False
+
+    async def receive():
+        while sent or not done:
+            line = await reader.readline()
+            if not line:
+                break
+            reply = json.loads(line)
+            latencies.append(time.perf_counter() - sent.pop(reply["id"]))
+            if not reply["ok"]:
+                errors.append(reply["error"])
+            window.release()
+
+    receiver = asyncio.create_task(receive())
+    rid = 0
+    while time.perf_counter() < deadline:
+        await window.acquire()
+        req = request(rng, accounts)
+        req["id"] = rid = rid + 1
+        sent[rid] = time.perf_counter()
+        writer.write(json.dumps(req).encode() + b"\n")
+        await writer.drain()
+    done = True
+    if not sent:
+        receiver.cancel()
+    await asyncio.gather(receiver, return_exceptions=True)
+    writer.close()
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run(host, port, connections, pipeline, seconds, n_accounts):
+    accounts = await setup(host, port, n_accounts)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, accounts, pipeline, start + seconds, latencies, errors, i)
+                           for i in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"connections={connections} pipeline={pipeline} accounts={n_accounts}")
+    print(f"ops          {len(latencies):,} in {elapsed:.2f}s  ({len(latencies) / elapsed:,.0f} ops/sec)")
+    if latencies:
+        print(f"latency      p50 {percentile(latencies, 0.50) * 1000:.2f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms  max {latencies[-1] * 1000:.2f} ms")
+    print(f"errors       {len(errors)}")
+
+
+async def wait_for(host, port, timeout=10.0):
+    end = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > end:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def main(a):
+    server = None
+    if a.spawn:
+        here = os.path.dirname(os.path.abspath(__file__))
+        server = subprocess.Popen([sys.executable, os.path.join(here, "server.py"), "--host", a.host,
+                                   "--port", str(a.port), "--max-connections", str(a.connections + 1)],
+                                  cwd=here, stdout=subprocess.DEVNULL)
+    try:
+        await wait_for(a.host, a.port)
+        await run(a.host, a.port, a.connections, a.pipeline, a.seconds, a.accounts)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--connections", type=int, default=16)
+    p.add_argument("--pipeline", type=int, default=8, help="requests in flight per connection")
+    p.add_argument("--seconds", type=float, default=10)
+    p.add_argument("--accounts", type=int, default=1000)
+    p.add_argument("--spawn", action="store_true", help="run a local server.py for the test")
+    asyncio.run(main(p.parse_args()))
@@ -1,9 +1,11 @@
-from models import Bank
 import operations as op
+import storage
+
+DATA_DIR = "bank_data"
 
 
 def menu():
-    bank = Bank()
+    bank = storage.open_bank(DATA_DIR)
 
     while True:
         print("""
@@ -27,6 +29,7 @@ def menu():
         elif c == "5":
             op.statement(bank)
         elif c == "6":
+            storage.close_bank(bank, DATA_DIR)
             break
         else:
             print("Invalid option")
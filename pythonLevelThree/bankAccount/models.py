@@ -1,9 +1,13 @@
 from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Sequence
 from dataclasses import dataclass, field
 from datetime import datetime
-from decimal import Decimal
-from typing import List
+from decimal import Decimal, ROUND_HALF_EVEN
+from fractions import Fraction
+from functools import wraps
 from enum import Enum
+import time
 
 
 class TransactionType(Enum):
@@ -24,26 +28,129 @@ class Transaction:
     balance_after: Decimal = Decimal("0")
 
 
+# money is stored as integer paise, Decimal only at the edges
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1    # what the ledger's array("q") columns hold
+
+
+def to_minor(amount):
+    return int64(int(Decimal(amount).quantize(Decimal("0.01"), rounding=ROUND_HALF_EVEN).scaleb(2)))
+
+
+def int64(units):
+    # refuse paise the ledger cannot store, before any balance has changed
+    if not INT64_MIN <= units <= INT64_MAX:
+        raise ValueError(f"amount out of range: {from_minor(units)}")
+    return units
+
+
+def from_minor(units):
+    return Decimal(units).scaleb(-2)
+
+
+def monthly_interest(balance, rate):
+    # balance * rate / 12 in paise, exact, rounded half-even
+    r = Fraction(rate) / 12
+    q, rem = divmod(balance * r.numerator, r.denominator)
+    if 2 * rem > r.denominator or (2 * rem == r.denominator and q % 2):
+        q += 1
+    return q
+
+
+TYPES = list(TransactionType)
+TYPE_CODE = {t: i for i, t in enumerate(TYPES)}
+DESCS, DESC_ID = [], {}
+
+
+def intern_desc(desc):
+    i = DESC_ID.get(desc)
+    if i is None:
+        i = DESC_ID[desc] = len(DESCS)
+        DESCS.append(desc)
+    return i
+
+
+class Ledger(Sequence):
+    # one typed array per column, ~29 bytes a row; rows become Transactions on read
+    def __init__(self):
+        self.amounts = array("q")
+        self.types = array("B")
+        self.timestamps = array("q")    # epoch ns
+        self.balances = array("q")
+        self.descs = array("I")
+
+    def record(self, t_type, amount, balance, desc=""):
+        self.amounts.append(amount)
+        self.types.append(TYPE_CODE[t_type])
+        self.timestamps.append(time.time_ns())
+        self.balances.append(balance)
+        self.descs.append(intern_desc(desc))
+
+    def append(self, t):
+        self.record(t.type, to_minor(t.amount), to_minor(t.balance_after), t.description)
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("ledger index out of range")
+        return Transaction(TYPES[self.types[i]], from_minor(self.amounts[i]),
+                           datetime.fromtimestamp(self.timestamps[i] / 1e9),
+                           DESCS[self.descs[i]], from_minor(self.balances[i]))
+
+
+def journaled(method):
+    # one log frame and one change-feed group per outermost call, so a transfer
+    # or an overdraft hits disk whole and reaches listeners together
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        journal, feed = self.journal, self.feed
+        if journal is None and feed is None:
+            return method(self, *args, **kwargs)
+        sinks = [s for s in (journal, feed) if s is not None]
+        for sink in sinks:
+            sink.depth += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            for sink in sinks:
+                sink.depth -= 1
+                if not sink.depth:
+                    sink.commit()
+    return wrapper
+
+
 class Account(ABC):
+    journal = None      # storage.Journal when the bank is persistent
+    feed = None         # Bank_ChangeFeed.ChangeFeed when the bank publishes its changes
+
     def __init__(self, account_number: str, owner: str, initial_balance: Decimal):
         self.account_number = account_number
         self.owner = owner
-        self._balance = initial_balance
-        self.transactions: List[Transaction] = []
+        self._cents = to_minor(initial_balance)
+        self.transactions = Ledger()
 
     @property
     def balance(self):
-        return self._balance
+        return from_minor(self._cents)
 
     def _record(self, t_type, amount, desc=""):
-        self.transactions.append(
-            Transaction(t_type, amount, description=desc, balance_after=self._balance)
-        )
+        self.transactions.record(t_type, amount, self._cents, desc)
+        if self.journal is not None:
+            self.journal.row(self)
+        if self.feed is not None:
+            self.feed.row(self, t_type, amount, desc)
 
+    @journaled
     def deposit(self, amount: Decimal):
+        amount = to_minor(amount)
         if amount <= 0:
             return False
-        self._balance += amount
+        self._cents = int64(self._cents + amount)
         self._record(TransactionType.DEPOSIT, amount)
         return True
 
@@ -67,16 +174,19 @@ class Account(ABC):
 class SavingsAccount(Account):
     RATE = Decimal("0.02")
 
+    @journaled
     def withdraw(self, amount):
-        if amount > self._balance:
+        amount = to_minor(amount)
+        if amount > self._cents:
             return False
-        self._balance -= amount
+        self._cents -= amount
         self._record(TransactionType.WITHDRAWAL, amount)
         return True
 
+    @journaled
     def calculate_interest(self):
-        interest = self._balance * self.RATE / 12
-        self._balance += interest
+        interest = monthly_interest(self._cents, self.RATE)
+        self._cents = int64(self._cents + interest)
         self._record(TransactionType.INTEREST, interest)
 
 
@@ -84,13 +194,15 @@ class CheckingAccount(Account):
     OVERDRAFT = Decimal("500")
     FEE = Decimal("35")
 
+    @journaled
     def withdraw(self, amount):
-        if self._balance + self.OVERDRAFT < amount:
+        amount = to_minor(amount)
+        if self._cents + to_minor(self.OVERDRAFT) < amount:
             return False
-        self._balance -= amount
-        if self._balance < 0:
-            self._balance -= self.FEE
-            self._record(TransactionType.FEE, self.FEE)
+        self._cents -= amount
+        if self._cents < 0:
+            self._cents -= to_minor(self.FEE)
+            self._record(TransactionType.FEE, to_minor(self.FEE))
         self._record(TransactionType.WITHDRAWAL, amount)
         return True
 
@@ -101,24 +213,31 @@ class CheckingAccount(Account):
 class BusinessAccount(Account):
     RATE = Decimal("0.01")
 
+    @journaled
     def withdraw(self, amount):
-        if amount > self._balance:
+        amount = to_minor(amount)
+        if amount > self._cents:
             return False
-        self._balance -= amount
+        self._cents -= amount
         self._record(TransactionType.WITHDRAWAL, amount)
         return True
 
+    @journaled
     def calculate_interest(self):
-        interest = self._balance * self.RATE / 12
-        self._balance += interest
+        interest = monthly_interest(self._cents, self.RATE)
+        self._cents = int64(self._cents + interest)
         self._record(TransactionType.INTEREST, interest)
 
 
 class Bank:
+    journal = None
+    feed = None
+
     def __init__(self):
         self.accounts = {}
         self._next = 1001
 
+    @journaled
     def create_account(self, acc_type, owner, deposit):
         acc_no = str(self._next)
         self._next += 1
@@ -131,11 +250,19 @@ class Bank:
             acc = BusinessAccount(acc_no, owner, deposit)
 
         self.accounts[acc_no] = acc
+        if self.journal is not None:
+            acc.journal = self.journal
+            self.journal.create(acc)
+        if self.feed is not None:
+            acc.feed = self.feed
+            self.feed.create(acc)
         return acc
 
+    @journaled
     def transfer(self, a, b, amt):
         if a not in self.accounts or b not in self.accounts:
             return False
+        int64(self.accounts[b]._cents + to_minor(amt))      # a credit that cannot land must not debit
         if self.accounts[a].withdraw(amt):
             self.accounts[b].deposit(amt)
             return True
@@ -0,0 +1,179 @@
+# asyncio TCP front end for models.Bank, one JSON object per line
+#
+#   python server.py --port 8765 [--data bank_data] [--max-connections 100]
+#
+#   -> {"id": 1, "op": "deposit", "account": "1001", "amount": "50"}
+#   <- {"id": 1, "ok": true, "result": true}
+#
+# ops: create(type, owner, amount) deposit(account, amount) withdraw(account, amount)
+#      transfer(from, to, amount) balance(account) statement(account)
+#
+# clients may pipeline: keep sending lines without waiting; every reply carries its
+# request id and replies can come back out of order. each operation runs to completion
+# on the event loop thread, so operations never interleave and need no account locks.
+# with --data, operations are committed to the log right away but fsynced by one
+# group-commit task on a worker thread; a change is only acknowledged once it is on disk.
+
+from decimal import Decimal, InvalidOperation
+import argparse
+import asyncio
+import json
+import signal
+
+from models import Bank, to_minor
+import storage
+
+
+def account(bank, number):
+    acc = bank.accounts.get(str(number))
+    if acc is None:
+        raise KeyError(f"unknown account {number}")
+    return acc
+
+
+def money(r, opening=False):
+    # a finite amount > 0 (>= 0 for an opening balance), else the request is refused
+    try:
+        value = Decimal(str(r.get("amount", "0") if opening else r["amount"]))
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {r.get('amount')!r}") from None
+    if not value.is_finite() or value < 0 or (value == 0 and not opening):
+        raise ValueError(f"invalid amount {r.get('amount')!r}")
+    try:
+        to_minor(value)         # ValueError beyond the int64 paise the ledger stores
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"amount out of range {r.get('amount')!r}") from None
+    return value
+
+
+OPS = {
+    "create": lambda bank, r: bank.create_account(r["type"], r["owner"], money(r, opening=True)).account_number,
+    "deposit": lambda bank, r: account(bank, r["account"]).deposit(money(r)),
+    "withdraw": lambda bank, r: account(bank, r["account"]).withdraw(money(r)),
+    "transfer": lambda bank, r: bank.transfer(str(r["from"]), str(r["to"]), money(r)),
+    "balance": lambda bank, r: str(account(bank, r["account"]).balance),
+    "statement": lambda bank, r: account(bank, r["account"]).get_statement(),
+}
+READ_ONLY = {"balance", "statement"}
+
+
+class GroupCommit:
+    # fsyncs the journal on a worker thread; every waiter is released by the first
+    # fsync that starts after it joined, so one disk flush covers a whole burst of operations
+    def __init__(self, journal):
+        self.journal = journal
+        self.next = None        # future resolved by the next fsync to start
+        self.busy = False
+
+    async def wait(self):
+        if self.next is None:
+            self.next = asyncio.get_running_loop().create_future()
+            if not self.busy:
+                self.busy = True
+                asyncio.create_task(self.flush())
+        await asyncio.shield(self.next)
+
+    async def flush(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self.next is not None:
+                done, self.next = self.next, None
+                try:
+                    await loop.run_in_executor(None, self.journal.sync)
+                    done.set_result(None)
+                except OSError as e:
+                    done.set_exception(e)
+        finally:
+            self.busy = False
+
+
+class BankServer:
+    def __init__(self, bank, max_connections=100, max_inflight=256):
+        self.bank = bank
+        self.max_connections = max_connections
+        self.max_inflight = max_inflight    # pipelined requests per connection before we stop reading
+        self.connections = 0
+        self.commits = GroupCommit(bank.journal) if bank.journal is not None else None
+
+    async def run(self, req):
+        name = req.get("op")
+        op = OPS.get(name)
+        if op is None:
+            raise ValueError(f"unknown op {name!r}")
+        result = op(self.bank, req)
+        if self.commits is not None and name not in READ_ONLY:
+            await self.commits.wait()
+        return result
+
+    async def serve(self, line, writer, inflight):
+        rid = None
+        try:
+            req = json.loads(line)
+            rid = req.get("id")
+            reply = {"id": rid, "ok": True, "result": await self.run(req)}
+        except (ValueError, KeyError, TypeError, AttributeError, OSError) as e:
+            reply = {"id": rid, "ok": False, "error": str(e.args[0]) if e.args else type(e).__name__}
+        except Exception as e:                  # never leave a request unanswered
+            reply = {"id": rid, "ok": False, "error": f"internal error: {type(e).__name__}"}
+        finally:
+            inflight.release()
+        writer.write(json.dumps(reply).encode() + b"\n")
+
+    async def handle(self, reader, writer):
+        if self.connections >= self.max_connections:
+            writer.write(b'{"id": null, "ok": false, "error": "server busy"}\n')
+            await writer.drain()
+            writer.close()
+            return
+        self.connections += 1
+        inflight = asyncio.Semaphore(self.max_inflight)
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                await inflight.acquire()
+                task = asyncio.create_task(self.serve(line, writer, inflight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await writer.drain()        # a client that stops reading stops being read
+            if tasks:
+                await asyncio.gather(*tasks)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+
+async def main(host="127.0.0.1", port=8765, data=None, max_connections=100):
+    bank = storage.open_bank(data, sync_every=0) if data else Bank()     # GroupCommit does the fsyncs
+    server = BankServer(bank, max_connections)
+    srv = await asyncio.start_server(server.handle, host, port, limit=1 << 20)
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):    # windows: ctrl-c still raises KeyboardInterrupt
+            pass
+    print(f"bank server on {host}:{port}", flush=True)
+    try:
+        async with srv:
+            await stop.wait()
+    finally:
+        if data:
+            storage.close_bank(bank, data)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--data", help="directory for the write-ahead log and snapshot (default: in memory)")
+    p.add_argument("--max-connections", type=int, default=100)
+    a = p.parse_args()
+    try:
+        asyncio.run(main(a.host, a.port, a.data, a.max_connections))
+    except KeyboardInterrupt:
+        pass
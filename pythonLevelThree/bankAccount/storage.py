@@ -0,0 +1,164 @@
+# durable storage for models.Bank: write-ahead log + snapshot in one directory
+#
+#   bank = open_bank("bank_data")    # load snapshot, replay log
+#   ...                              # every operation is logged before it returns
+#   close_bank(bank)                 # snapshot, empty the log
+#
+# log frame: <II> length, crc32, then a pickled list of the operation's records
+#   ("C", acc_no, class name, owner, cents)
+#   ("R", acc_no, row index, amount, type code, timestamp ns, balance after, description)
+
+from array import array
+import os
+import pickle
+import struct
+import zlib
+
+from models import Bank, BusinessAccount, CheckingAccount, SavingsAccount, intern_desc, DESCS
+
+FRAME = struct.Struct("<II")
+CLASSES = {c.__name__: c for c in (SavingsAccount, CheckingAccount, BusinessAccount)}
+LOG, SNAPSHOT = "bank.log", "bank.snapshot"
+
+
+class Journal:
+    # sync_every: fsync after this many commits (1 = every operation,
+    # bigger = group commit trading a few operations for speed, 0 = leave it to the OS)
+    def __init__(self, path, sync_every=1):
+        self.path = path
+        self.sync_every = sync_every
+        self.f = open(path, "ab")
+        self.pending = []
+        self.unsynced = 0
+        self.depth = 0      # nesting of @journaled calls
+
+    def create(self, acc):
+        self.pending.append(("C", acc.account_number, type(acc).__name__, acc.owner, acc._cents))
+
+    def row(self, acc):
+        t = acc.transactions
+        i = len(t) - 1
+        self.pending.append(("R", acc.account_number, i, t.amounts[i], t.types[i],
+                             t.timestamps[i], t.balances[i], DESCS[t.descs[i]]))
+
+    def commit(self):
+        if not self.pending:
+            return
+        payload = pickle.dumps(self.pending, pickle.HIGHEST_PROTOCOL)
+        self.pending = []
+        self.f.write(FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.unsynced += 1
+        if self.sync_every and self.unsynced >= self.sync_every:
+            self.sync()
+        else:
+            self.f.flush()
+
+    def sync(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.unsynced = 0
+
+    def truncate(self):
+        self.sync()
+        self.f.close()
+        self.f = open(self.path, "wb")
+
+    def close(self):
+        self.commit()
+        self.sync()
+        self.f.close()
+
+
+def read_log(path):
+    # yields each intact frame's records; a torn tail is cut off
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    pos = 0
+    while pos + FRAME.size <= len(raw):
+        n, crc = FRAME.unpack_from(raw, pos)
+        body = raw[pos + FRAME.size:pos + FRAME.size + n]
+        if len(body) < n or zlib.crc32(body) != crc:
+            break
+        pos += FRAME.size + n
+        yield pickle.loads(body)
+    if pos != len(raw):
+        with open(path, "r+b") as fh:
+            fh.truncate(pos)
+
+
+def apply(bank, record):
+    # idempotent: rows the bank already has (from the snapshot) are skipped
+    if record[0] == "C":
+        _, no, cls, owner, cents = record
+        if no not in bank.accounts:
+            acc = CLASSES[cls](no, owner, 0)
+            acc._cents = cents
+            bank.accounts[no] = acc
+            bank._next = max(bank._next, int(no) + 1)
+        return
+    _, no, i, amount, code, stamp, balance, desc = record
+    acc = bank.accounts[no]
+    t = acc.transactions
+    if i < len(t):
+        return
+    t.amounts.append(amount)
+    t.types.append(code)
+    t.timestamps.append(stamp)
+    t.balances.append(balance)
+    t.descs.append(intern_desc(desc))
+    acc._cents = balance
+
+
+def save_snapshot(bank, path):
+    state = {"next": bank._next, "descs": list(DESCS), "accounts": [
+        (acc.account_number, type(acc).__name__, acc.owner, acc._cents,
+         [getattr(acc.transactions, c).tobytes() for c in ("amounts", "types", "timestamps", "balances", "descs")])
+        for acc in bank.accounts.values()]}
+    with open(path + ".tmp", "wb") as fh:
+        pickle.dump(state, fh, pickle.HIGHEST_PROTOCOL)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def load_snapshot(path):
+    with open(path, "rb") as fh:
+        state = pickle.load(fh)
+    ids = [intern_desc(d) for d in state["descs"]]
+    bank = Bank()
+    bank._next = state["next"]
+    for no, cls, owner, cents, cols in state["accounts"]:
+        acc = CLASSES[cls](no, owner, 0)
+        acc._cents = cents
+        t = acc.transactions
+        for c, raw in zip(("amounts", "types", "timestamps", "balances", "descs"), cols):
+            getattr(t, c).frombytes(raw)
+        t.descs = array("I", [ids[d] for d in t.descs])
+        bank.accounts[no] = acc
+    return bank
+
+
+def open_bank(directory, sync_every=1):
+    os.makedirs(directory, exist_ok=True)
+    snap, log = os.path.join(directory, SNAPSHOT), os.path.join(directory, LOG)
+    bank = load_snapshot(snap) if os.path.exists(snap) else Bank()
+    if os.path.exists(log):
+        for records in read_log(log):
+            for record in records:
+                apply(bank, record)
+    bank.journal = Journal(log, sync_every)
+    for acc in bank.accounts.values():
+        acc.journal = bank.journal
+    return bank
+
+
+def snapshot_bank(bank, directory):
+    # a crash between the two steps is harmless: replay skips rows the snapshot has
+    bank.journal.commit()
+    save_snapshot(bank, os.path.join(directory, SNAPSHOT))
+    bank.journal.truncate()
+
+
+def close_bank(bank, directory):
+    snapshot_bank(bank, directory)
+    bank.journal.close()